@@ -0,0 +1,3 @@
+# posts per API page by default and at most, ?limit= picks in between.
+API_PAGE: int = 20
+API_MAX_PAGE: int = 100
@@ -0,0 +1,99 @@
+"""
+Plain dict serialization of posts, authors and groups.
+
+Posts are loaded with only the columns the requested fields need,
+authors of a whole page come from the author cache and groups are
+fetched with one query, so a page costs three queries at most.
+"""
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+
+from posts import authors
+from posts.models import Group
+
+# field: columns of the post it needs.
+POST_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'created': ('created',),
+    'author': ('author_id',),
+    'group': ('group_id',),
+    'image': ('image',),
+}
+
+
+def parse_fields(value):
+    """Post fields of ?fields=, all of them when it is empty."""
+    if not value:
+        return tuple(POST_FIELDS)
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in value.split(',') if field.strip()
+    ))
+    unknown = set(fields) - set(POST_FIELDS)
+    if unknown or not fields:
+        raise ValidationError(
+            f'Unknown fields: {", ".join(sorted(unknown))}. '
+            f'Available: {", ".join(POST_FIELDS)}.'
+        )
+
+    return fields
+
+
+def get_columns(fields):
+    """Columns to load, created and id always, cursors need them."""
+    columns = {'id', 'created'}
+    for field in fields:
+        columns.update(POST_FIELDS[field])
+
+    return sorted(columns)
+
+
+def serialize_user(author):
+    return {
+        'id': author.pk,
+        'username': author.username,
+        'full_name': author.get_full_name(),
+    }
+
+
+def serialize_group(group):
+    return {'id': group['id'], 'slug': group['slug'], 'title': group['title']}
+
+
+def get_authors(ids):
+    return {
+        pk: serialize_user(author)
+        for pk, author in authors.get_authors(ids).items()
+    }
+
+
+def get_groups(ids):
+    groups = Group.objects.filter(pk__in=ids).values('id', 'slug', 'title')
+
+    return {group['id']: serialize_group(group) for group in groups}
+
+
+def serialize_posts(posts, fields):
+    """Dicts of the posts with author and group embedded."""
+    authors = groups = {}
+    if 'author' in fields:
+        authors = get_authors({post.author_id for post in posts})
+    if 'group' in fields:
+        groups = get_groups(
+            {post.group_id for post in posts if post.group_id}
+        )
+    getters = {
+        'id': lambda post: post.pk,
+        'text': lambda post: post.text,
+        'created': lambda post: post.created.isoformat(),
+        'author': lambda post: authors.get(post.author_id),
+        'group': lambda post: groups.get(post.group_id),
+        'image': lambda post: (
+            default_storage.url(post.image.name) if post.image else None
+        ),
+    }
+    getters = [(field, getters[field]) for field in fields]
+
+    return [
+        {field: getter(post) for field, getter in getters} for post in posts
+    ]
@@ -0,0 +1,154 @@
+import json
+import time
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from api.constants import API_MAX_PAGE
+from api.serializers import serialize_posts
+from api.views import ApiView
+from posts.models import Follow, Group, Post, User
+from posts.tests.fixtures import TestBaseWithClients
+
+
+class ApiTests(TestBaseWithClients):
+    """Read-only JSON API v1."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.writers = [
+            User.objects.create_user(username=f'writer{i}', first_name='W')
+            for i in range(3)
+        ]
+        cls.groups = [
+            Group.objects.create(title=f'group {i}', slug=f'group-{i}')
+            for i in range(2)
+        ]
+        for i in range(API_MAX_PAGE + 5):
+            Post.objects.create(
+                text=f'post {i}',
+                author=cls.writers[i % 3],
+                group=cls.groups[i % 2] if i % 3 else None,
+            )
+        Follow.objects.create(user=cls.non_author, author=cls.writers[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_json(self, client, name, kwargs=None, **params):
+        response = client.get(reverse(f'api:v1:{name}', kwargs=kwargs), params)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+        return response, json.loads(response.content)
+
+    def test_posts_page(self):
+        """Автор и группа встроены, на страницу три запроса."""
+        with self.assertNumQueries(3):
+            _, data = self.get_json(self.client, 'posts', limit=API_MAX_PAGE)
+        results = data['results']
+        self.assertEqual(len(results), API_MAX_PAGE)
+        newest = Post.objects.order_by('-created', '-pk').first()
+        self.assertEqual(results[0]['id'], newest.pk)
+        self.assertEqual(
+            results[0]['author'],
+            {
+                'id': newest.author.pk,
+                'username': newest.author.username,
+                'full_name': newest.author.get_full_name(),
+            },
+        )
+        self.assertIsNotNone(data['next'])
+        self.assertIsNone(data['previous'])
+
+    def test_cursor_walks_all_posts(self):
+        seen = []
+        address = reverse('api:v1:posts') + '?limit=30&fields=id'
+        while address:
+            data = json.loads(self.client.get(address).content)
+            seen += [post['id'] for post in data['results']]
+            address = data['next']
+        self.assertEqual(
+            seen,
+            list(
+                Post.objects.order_by('-created', '-pk').values_list(
+                    'pk', flat=True
+                )
+            ),
+        )
+
+    def test_sparse_fields(self):
+        """?fields= убирает поля и лишние запросы."""
+        with self.assertNumQueries(1):
+            _, data = self.get_json(self.client, 'posts', fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response, data = self.get_json(self.client, 'posts', fields='secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', data['detail'])
+
+    def test_scoped_lists(self):
+        group = self.groups[0]
+        _, data = self.get_json(
+            self.client, 'group_posts', {'slug': group.slug}, limit=100
+        )
+        self.assertEqual(len(data['results']), group.posts.count())
+        self.assertTrue(all(
+            post['group']['slug'] == group.slug for post in data['results']
+        ))
+        writer = self.writers[1]
+        _, data = self.get_json(
+            self.client, 'profile', {'username': writer.username}
+        )
+        self.assertEqual(data['posts_count'], writer.posts.count())
+        response, _ = self.get_json(
+            self.client, 'group_posts', {'slug': 'missing'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_feed(self):
+        response, _ = self.get_json(self.client, 'feed')
+        self.assertEqual(response.status_code, 401)
+        _, data = self.get_json(self.non_author_client, 'feed', limit=100)
+        self.assertEqual(
+            {post['author']['id'] for post in data['results']},
+            {self.writers[0].pk},
+        )
+
+    def test_etag(self):
+        """304 по ETag, новый пост меняет ETag."""
+        address = reverse('api:v1:posts')
+        etag = self.client.get(address)['ETag']
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='new', author=self.author)
+        response = self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_interface(self):
+        """Views must implement get_data."""
+        with self.assertRaises(TypeError):
+            ApiView()
+
+    def test_follow_changes_both_profiles(self):
+        """Подписка меняет ETag профиля автора и профиля подписчика."""
+        addresses = [
+            reverse('api:v1:profile', args=[user.username])
+            for user in (self.writers[1], self.non_author)
+        ]
+        etags = [self.client.get(address)['ETag'] for address in addresses]
+        Follow.objects.create(user=self.non_author, author=self.writers[1])
+        author, follower = [
+            self.client.get(address, HTTP_IF_NONE_MATCH=etag)
+            for address, etag in zip(addresses, etags)
+        ]
+        self.assertEqual(author.status_code, 200)
+        self.assertEqual(json.loads(author.content)['followers_count'], 1)
+        self.assertEqual(follower.status_code, 200)
+        self.assertEqual(json.loads(follower.content)['following_count'], 2)
+
+    def test_serialization_is_fast(self):
+        """Страница из 100 постов сериализуется за миллисекунды."""
+        posts = list(Post.objects.all()[:API_MAX_PAGE])
+        fields = ('id', 'text', 'created', 'image')
+        started = time.perf_counter()
+        json.dumps(serialize_posts(posts, fields))
+        self.assertLess(time.perf_counter() - started, 0.05)
@@ -0,0 +1,31 @@
+from django.urls import include, path
+
+from . import views
+
+app_name = 'api'
+
+v1 = [
+    path('posts/', views.IndexView.as_view(), name='posts'),
+    path('posts/<int:post_id>/', views.PostView.as_view(), name='post'),
+    path('groups/<slug:slug>/', views.GroupView.as_view(), name='group'),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.GroupPostsView.as_view(),
+        name='group_posts'
+    ),
+    path(
+        'profiles/<str:username>/',
+        views.ProfileView.as_view(),
+        name='profile'
+    ),
+    path(
+        'profiles/<str:username>/posts/',
+        views.ProfilePostsView.as_view(),
+        name='profile_posts'
+    ),
+    path('feed/', views.FeedView.as_view(), name='feed'),
+]
+
+urlpatterns = [
+    path('v1/', include((v1, 'v1'))),
+]
@@ -0,0 +1,197 @@
+import json
+from abc import ABC, abstractmethod
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+
+from posts.authors import get_author
+from posts.cache import (
+    ScopeConditionalGetMixin,
+    author_scope,
+    feed_scope,
+    group_scope,
+)
+from posts.feed import get_feed, heavy_author_ids
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator
+from .constants import API_MAX_PAGE, API_PAGE
+from .serializers import get_columns, parse_fields, serialize_posts
+
+
+class JsonResponse(HttpResponse):
+    """Compact UTF-8 JSON, cheaper than django.http.JsonResponse."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(
+            json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+            **kwargs
+        )
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+class ApiView(ScopeConditionalGetMixin, View, ABC):
+    """
+    Read-only JSON endpoint. Validated by scope generations like pages,
+    answers 304 to a matching If-None-Match without touching posts.
+    """
+    http_method_names = ['get', 'head', 'options']
+    login_required = False
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.login_required and not request.user.is_authenticated:
+            return error(401, 'Authentication credentials were not provided.')
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return error(404, 'Not found.')
+        except (ValidationError, InvalidPage) as e:
+            return error(400, ' '.join(getattr(e, 'messages', [str(e)])))
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.get_data())
+
+    @abstractmethod
+    def get_data(self):
+        """Тело ответа, объект для json.dumps."""
+
+
+class PostListView(ApiView):
+    """Posts newest first, ?cursor= pages, ?limit= and ?fields= shape them."""
+
+    def get_queryset(self):
+        return Post.objects.all()
+
+    def get_limit(self):
+        limit = self.request.GET.get('limit', API_PAGE)
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= API_MAX_PAGE:
+            raise ValidationError(f'limit must be 1 to {API_MAX_PAGE}.')
+
+        return limit
+
+    def get_page_link(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params['cursor'] = cursor
+
+        return f'{self.request.path}?{params.urlencode()}'
+
+    def get_data(self):
+        fields = parse_fields(self.request.GET.get('fields'))
+        paginator = CursorPaginator(
+            self.get_queryset().only(*get_columns(fields)), self.get_limit()
+        )
+        page = paginator.page(self.request.GET.get('cursor'))
+
+        return {
+            'results': serialize_posts(page.object_list, fields),
+            'next': self.get_page_link(page.next_cursor),
+            'previous': self.get_page_link(page.previous_cursor),
+        }
+
+
+class IndexView(PostListView):
+    """All posts."""
+
+    def get_page_scopes(self):
+        return ['posts']
+
+
+class GroupPostsView(PostListView):
+    """Posts of the group."""
+
+    def get_page_scopes(self):
+        return [group_scope(self.kwargs['slug'])]
+
+    def get_queryset(self):
+        group = get_object_or_404(Group.objects.only('pk'), **self.kwargs)
+
+        return group.posts.all()
+
+
+class ProfilePostsView(PostListView):
+    """Posts of the author."""
+
+    def get_page_scopes(self):
+        return [author_scope(self.kwargs['username'])]
+
+    def get_queryset(self):
+        author = get_author(self.kwargs['username'])
+
+        return Post.objects.filter(author_id=author.pk)
+
+
+class FeedView(PostListView):
+    """Posts of authors the user follows."""
+    login_required = True
+
+    def get_page_scopes(self):
+        return ['posts', feed_scope(self.request.user.pk)]
+
+    def get_queryset(self):
+        user = self.request.user
+
+        return get_feed(user, list(heavy_author_ids(user)))
+
+
+class PostView(ApiView):
+    """One post, ?fields= apply."""
+
+    def get_page_scopes(self):
+        return ['posts']
+
+    def get_data(self):
+        fields = parse_fields(self.request.GET.get('fields'))
+        post = get_object_or_404(
+            Post.objects.only(*get_columns(fields)), pk=self.kwargs['post_id']
+        )
+
+        return serialize_posts([post], fields)[0]
+
+
+class GroupView(ApiView):
+    """Group with its posts count."""
+
+    def get_page_scopes(self):
+        return [group_scope(self.kwargs['slug'])]
+
+    def get_data(self):
+        group = get_object_or_404(Group, slug=self.kwargs['slug'])
+
+        return {
+            'id': group.pk,
+            'slug': group.slug,
+            'title': group.title,
+            'description': group.description,
+            'posts_count': group.posts_count,
+        }
+
+
+class ProfileView(ApiView):
+    """Author with the profile counters."""
+
+    def get_page_scopes(self):
+        return [author_scope(self.kwargs['username'])]
+
+    def get_data(self):
+        author = get_author(self.kwargs['username'])
+
+        return {
+            'id': author.pk,
+            'username': author.username,
+            'full_name': author.get_full_name(),
+            'posts_count': author.posts_count,
+            'followers_count': author.followers_count,
+            'following_count': author.following_count,
+        }
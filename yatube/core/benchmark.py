@@ -0,0 +1,219 @@
+"""
+Benchmark of posts and users pages.
+
+Every URL of posts.urls and users.urls is requested by a guest and by a
+logged in reader on the current database, seeded by seed_data. The first
+request runs on cold caches, the rest give latency percentiles, one more
+under tracemalloc gives peak memory. Requests run in autocommit as in
+production, so reads go to replicas and on_commit hooks run; comments
+and follows the reader made are undone after every URL, so they do not
+pile up between runs and baselines. Results are compared to a saved
+baseline to flag regressions.
+"""
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.db.models import Max
+from django.http import HttpResponseServerError
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from core.routers import use_primary
+from posts.models import Comment, Follow, Group, Post
+from posts.queries import QueryRecorder
+from posts.urls import app_name as posts_app, urlpatterns as posts_urls
+from users.models import Profile
+from users.urls import app_name as users_app, urlpatterns as users_urls
+
+logger = logging.getLogger(__name__)
+
+# Views taking POST only and the data to send them.
+POST_DATA = {'posts:add_comment': {'text': 'benchmark'}}
+# Views logging the client out, it is logged in again before each request.
+LOGOUT = {'users:logout'}
+# Noise floors, smaller differences are never regressions.
+MIN_SLOWDOWN_MS = 1
+MIN_GROWTH_KB = 64
+
+
+def percentile(values, share):
+    values = sorted(values)
+    if not values:
+        return 0
+
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def get_samples():
+    """URL kwargs pointing at the busiest author, group and post."""
+    author = get_user('-posts_count')
+    group = Group.objects.order_by('-posts_count').first()
+    post = Post.objects.order_by('-comments_count').first()
+
+    return {
+        'username': author.username,
+        'slug': group.slug if group else 'none',
+        'post_id': post.pk if post else 0,
+        'uidb64': 'MQ',
+        'token': 'set-password',
+    }
+
+
+def get_targets(samples):
+    """[(view name, address)] of every posts and users URL."""
+    targets = []
+    for namespace, patterns in (
+        (posts_app, posts_urls), (users_app, users_urls)
+    ):
+        for pattern in patterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            name = f'{namespace}:{pattern.name}'
+            kwargs = {
+                key: samples[key] for key in pattern.pattern.converters
+            }
+            targets.append((name, reverse(name, kwargs=kwargs)))
+
+    return targets
+
+
+def get_user(order):
+    profile = Profile.objects.select_related('user').order_by(order).first()
+    if profile is None:
+        raise CommandError('Нет пользователей, запустите seed_data.')
+
+    return profile.user
+
+
+def get_reader():
+    """User following the most authors, so the feed is the largest."""
+    return get_user('-following_count')
+
+
+@contextmanager
+def undo_writes(user):
+    """Deletes comments and follows of the user made inside the block."""
+    last_comment = Comment.objects.aggregate(last=Max('pk'))['last'] or 0
+    follows = set(user.follower.values_list('author_id', flat=True))
+    try:
+        yield
+    finally:
+        with use_primary():
+            Comment.objects.filter(
+                author=user, pk__gt=last_comment
+            ).delete()
+            current = set(user.follower.values_list('author_id', flat=True))
+            Follow.objects.filter(
+                user=user, author_id__in=current - follows
+            ).delete()
+            for author_id in follows - current:
+                Follow.objects.create(user=user, author_id=author_id)
+
+
+def request(client, name, address):
+    """Response of the view, a bare 500 if it raised."""
+    try:
+        if name in POST_DATA:
+            return client.post(address, POST_DATA[name])
+        return client.get(address)
+    except Exception:
+        logger.exception('%s %s failed', name, address)
+
+        return HttpResponseServerError()
+
+
+def measure(client, name, address, repeats, user=None):
+    """Latency percentiles, query counts and peak memory of one URL."""
+    def call():
+        if user is not None and name in LOGOUT:
+            client.force_login(user)
+        return request(client, name, address)
+
+    cache.clear()
+    with QueryRecorder() as cold:
+        started = time.perf_counter()
+        response = call()
+        cold_ms = (time.perf_counter() - started) * 1000
+    latencies = []
+    for _ in range(repeats):
+        with QueryRecorder() as warm:
+            started = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'cold_ms': round(cold_ms, 2),
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'cold_queries': len(cold),
+        'queries': len(warm) if repeats else 0,
+        'n_plus_one': len(cold.get_repeated()),
+        'memory_kb': round(peak / 1024),
+    }
+
+
+def run(repeats=20, names=None):
+    """{'view name guest|reader': measurements} of every target."""
+    reader = get_reader()
+    results = {}
+    for name, address in get_targets(get_samples()):
+        if names and name not in names:
+            continue
+        guest = Client()
+        logged_in = Client()
+        logged_in.force_login(reader)
+        for role, client, user in (
+            ('guest', guest, None), ('reader', logged_in, reader)
+        ):
+            with undo_writes(reader):
+                results[f'{name} {role}'] = dict(
+                    measure(client, name, address, repeats, user),
+                    address=address,
+                )
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Regressions of results against the baseline, as messages."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        slower = result['p95_ms'] - base['p95_ms']
+        if (
+            slower > MIN_SLOWDOWN_MS
+            and result['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+        ):
+            regressions.append(
+                f'{key}: p95 {base["p95_ms"]} -> {result["p95_ms"]} ms'
+            )
+        for field in ('cold_queries', 'queries', 'n_plus_one'):
+            if result[field] > base[field]:
+                regressions.append(
+                    f'{key}: {field} {base[field]} -> {result[field]}'
+                )
+        grown = result['memory_kb'] - base['memory_kb']
+        if (
+            grown > MIN_GROWTH_KB
+            and result['memory_kb'] > base['memory_kb'] * (1 + tolerance)
+        ):
+            regressions.append(
+                f'{key}: memory {base["memory_kb"]} -> '
+                f'{result["memory_kb"]} KB'
+            )
+
+    return regressions
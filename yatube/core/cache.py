@@ -0,0 +1,144 @@
+"""
+Cache backends counting hits and misses in request metrics,
+and stampede protection for values that are expensive to compute.
+
+CACHE_BACKEND picks LocMemCache for one process, FileBasedCache shared by
+the workers of a host or RedisCache shared by all hosts. get_or_refresh()
+lets only one worker compute a missing value while the others wait for
+it, and refreshes values early at random before they expire, so they
+do not expire everywhere at once. A None result is kept for NONE_TIMEOUT
+only, so the waiters learn there is nothing to wait for. invalidate()
+drops cached values now and once more after the transaction commits.
+
+Only whole anonymous page renders go through get_or_refresh(). Post card
+fragments ({% cache %} in templates), author records and querysets of
+logged in pages are plain cache reads: a miss is computed by every
+worker that hits it, each of them is cheap next to a page render.
+"""
+import math
+import random
+import threading
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends import filebased, locmem
+from django.db import transaction
+
+from .metrics import REGISTRY, count_cache
+
+try:
+    from django_redis.cache import RedisCache as BaseRedisCache
+except ImportError:
+    BaseRedisCache = None
+
+# How long a computation may hold the lock, seconds.
+LOCK_TIMEOUT = 10
+# How long waiters wait for the computing worker, seconds.
+WAIT_TIMEOUT = 2
+WAIT_INTERVAL = 0.05
+# How long a None result is kept, seconds.
+NONE_TIMEOUT = 5
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Counts reads, get_many() built on get() is counted once."""
+    _local = threading.local()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        hit = value is not _missing
+        if not getattr(self._local, 'in_get_many', False):
+            count_cache(int(hit), int(not hit))
+
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        self._local.in_get_many = True
+        try:
+            values = super().get_many(keys, version)
+        finally:
+            self._local.in_get_many = False
+        count_cache(len(values), len(keys) - len(values))
+
+        return values
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+if BaseRedisCache is not None:
+    class RedisCache(InstrumentedCacheMixin, BaseRedisCache):
+        pass
+
+
+def is_fresh(expires, delta, beta=1.0):
+    """
+    False a bit before expiry, more likely the closer it is and the
+    longer the value took to compute (XFetch).
+    """
+    return time.time() - delta * beta * math.log(random.random()) < expires
+
+
+def compute(key, function, timeout, reason, cache):
+    started = time.time()
+    value = function()
+    if value is None:
+        timeout = min(timeout, NONE_TIMEOUT)
+    delta = time.time() - started
+    cache.set(key, (value, time.time() + timeout, delta), timeout)
+    REGISTRY.inc('yatube_cache_refresh_total', reason=reason)
+
+    return value
+
+
+def get_or_refresh(key, function, timeout, cache=default_cache):
+    """
+    Cached result of function(), None results only for NONE_TIMEOUT.
+    One caller computes it at a time, the rest serve the current value
+    or, if there is none, wait for the new one.
+    """
+    lock_key = f'lock:{key}'
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if is_fresh(expires, delta) or not cache.add(
+            lock_key, 1, LOCK_TIMEOUT
+        ):
+            return value
+        reason = 'early'
+    elif cache.add(lock_key, 1, LOCK_TIMEOUT):
+        reason = 'miss'
+    else:
+        deadline = time.time() + WAIT_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                REGISTRY.inc('yatube_cache_waits_total', result='filled')
+                return entry[0]
+        REGISTRY.inc('yatube_cache_waits_total', result='timeout')
+
+        return compute(key, function, timeout, 'wait_timeout', cache)
+
+    try:
+        return compute(key, function, timeout, reason, cache)
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate(drop, *args):
+    """
+    Runs drop(*args) now and again on commit: until then other requests
+    read the old rows and may cache them.
+    """
+    drop(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: drop(*args))
@@ -0,0 +1,139 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+from core.benchmark import percentile
+from yatube.db.sqlite3.base import DEFAULT_PRAGMAS
+
+# PRAGMAS of stock SQLite, journal_mode is stored in the file
+# so it is switched back explicitly. Lock waits are left to the
+# driver's default timeout, as with the stock Django backend.
+STOCK_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'mmap_size': 0,
+    'cache_size': -2000,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает стандартный SQLite и режим с WAL: чтения главной '
+        'страницы и ленты подписок параллельно с записью комментариев '
+        'и подписок. Работает на временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+
+    def handle(self, *args, **options):
+        database = connections.databases['default']
+        if database['ENGINE'] != 'yatube.db.sqlite3':
+            self.stderr.write('Нужен движок yatube.db.sqlite3.')
+            return
+        # Per request log lines would drown the report.
+        logging.getLogger('core.middleware').setLevel(logging.WARNING)
+        with tempfile.TemporaryDirectory() as directory:
+            connections['default'].close()
+            database['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+            call_command('migrate', verbosity=0)
+            users = self.seed()
+            for mode, pragmas in (
+                ('stock', STOCK_PRAGMAS), ('tuned', DEFAULT_PRAGMAS)
+            ):
+                connections['default'].close()
+                database['PRAGMAS'] = pragmas
+                result = self.run(users, **options)
+                self.stdout.write(
+                    f'{mode}: {result["reads"] / options["seconds"]:.0f} '
+                    f'reads/s (p95 {result["p95"] * 1000:.1f} ms), '
+                    f'{result["writes"] / options["seconds"]:.0f} writes/s, '
+                    f'{result["errors"]} errors'
+                )
+            connections['default'].close()
+
+    def seed(self):
+        from posts.models import Follow, Group, Post, User
+
+        group = Group.objects.create(title='bench', slug='bench')
+        users = [
+            User.objects.create_user(username=f'bench{i}') for i in range(20)
+        ]
+        for user in users:
+            Post.objects.bulk_create(
+                Post(text=f'post {i}', author=user, group=group)
+                for i in range(20)
+            )
+        for reader in users[:10]:
+            for author in users[10:]:
+                Follow.objects.create(user=reader, author=author)
+
+        return users
+
+    def read(self, user):
+        """Главная страница и лента подписок до конца замера."""
+        client = Client()
+        client.force_login(user)
+        latencies = []
+        errors = 0
+        while time.monotonic() < self.deadline:
+            for address in ('/', '/follow/'):
+                started = time.monotonic()
+                if client.get(address).status_code != 200:
+                    errors += 1
+                latencies.append(time.monotonic() - started)
+        with self.lock:
+            self.result['reads'] += len(latencies)
+            self.result['latencies'] += latencies
+            self.result['errors'] += errors
+        connections['default'].close()
+
+    def write(self, user, author):
+        """Комментарии и подписка/отписка до конца замера."""
+        from posts.models import Comment, Follow, Post
+
+        post = Post.objects.first()
+        writes = errors = 0
+        while time.monotonic() < self.deadline:
+            try:
+                Comment.objects.create(post=post, author=user, text='w')
+                follow, created = Follow.objects.get_or_create(
+                    user=user, author=author
+                )
+                if not created:
+                    follow.delete()
+                writes += 2
+            except Exception:
+                errors += 1
+        with self.lock:
+            self.result['writes'] += writes
+            self.result['errors'] += errors
+        connections['default'].close()
+
+    def run(self, users, seconds, readers, writers, **options):
+        self.deadline = time.monotonic() + seconds
+        self.lock = threading.Lock()
+        self.result = {'reads': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+        threads = [
+            threading.Thread(target=self.read, args=(users[i % 10],))
+            for i in range(readers)
+        ] + [
+            threading.Thread(target=self.write, args=(users[i], users[-1 - i]))
+            for i in range(writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.result['p95'] = percentile(self.result['latencies'], 0.95)
+
+        return self.result
@@ -0,0 +1,67 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки (p50/p95/p99), число запросов к базе и пик '
+        'памяти на всех адресах posts и users для гостя и читателя. '
+        'Базу сначала заполняет seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeats', type=int, default=20)
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help='Только эти имена адресов, например posts:index.'
+        )
+        parser.add_argument('--save', help='Записать результаты в файл.')
+        parser.add_argument('--baseline', help='Сравнить с файлом.')
+        parser.add_argument('--tolerance', type=float, default=0.2)
+        parser.add_argument(
+            '--fail', action='store_true',
+            help='Завершиться с ошибкой при регрессиях.'
+        )
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('База пуста, запустите seed_data.')
+        # Per request log lines would drown the report.
+        logging.getLogger('core.middleware').setLevel(logging.WARNING)
+        logging.getLogger('posts').setLevel(logging.ERROR)
+
+        results = benchmark.run(options['repeats'], options['views'])
+        self.stdout.write(
+            f'{"view":<42} {"code":>4} {"cold":>8} {"p50":>8} {"p95":>8} '
+            f'{"p99":>8} {"q cold":>6} {"q":>4} {"N+1":>3} {"KB":>7}'
+        )
+        for key, result in results.items():
+            self.stdout.write(
+                f'{key:<42} {result["status"]:>4} {result["cold_ms"]:>8} '
+                f'{result["p50_ms"]:>8} {result["p95_ms"]:>8} '
+                f'{result["p99_ms"]:>8} {result["cold_queries"]:>6} '
+                f'{result["queries"]:>4} {result["n_plus_one"]:>3} '
+                f'{result["memory_kb"]:>7}'
+            )
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Результаты записаны в {options["save"]}.')
+        if not options['baseline']:
+            return
+
+        with open(options['baseline']) as file:
+            regressions = benchmark.compare(
+                results, json.load(file), options['tolerance']
+            )
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+        elif options['fail']:
+            raise CommandError(f'Регрессий: {len(regressions)}.')
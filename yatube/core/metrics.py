@@ -0,0 +1,206 @@
+"""
+Request instrumentation.
+
+MetricsMiddleware starts RequestMetrics for every request. DB queries,
+template renders, thumbnail lookups and cache reads add to the metrics
+of the current request, and totals of all requests are kept in REGISTRY
+for the /metrics endpoint in Prometheus text format.
+
+REGISTRY is per process: behind a server with several worker processes
+each scrape sees the totals of whichever worker answered, scrape every
+worker on its own port or run one worker per scraped target.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.template.base import Template
+
+# name: (type, help) of exported metrics.
+METRICS = {
+    'yatube_requests_total': ('counter', 'Requests handled.'),
+    'yatube_request_seconds_total': ('counter', 'Time spent in requests.'),
+    'yatube_db_queries_total': (
+        'counter', 'Database queries run, by database alias.'
+    ),
+    'yatube_db_seconds_total': (
+        'counter', 'Time spent in database, by database alias.'
+    ),
+    'yatube_template_seconds_total': (
+        'counter', 'Time spent rendering templates, includes nested ones.'
+    ),
+    'yatube_thumbnail_seconds_total': (
+        'counter', 'Time spent looking up and generating thumbnails.'
+    ),
+    'yatube_cache_requests_total': ('counter', 'Cache reads by result.'),
+    'yatube_cache_refresh_total': (
+        'counter', 'Cached values computed, by miss, early refresh '
+        'or wait timeout.'
+    ),
+    'yatube_cache_waits_total': (
+        'counter', 'Waits for a value another worker computes, by result.'
+    ),
+}
+
+_local = threading.local()
+
+
+class Registry:
+    """Process wide metric totals."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] += value
+
+    def get(self, name, **labels):
+        return self._values.get((name, tuple(sorted(labels.items()))), 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """Prometheus text exposition format."""
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = []
+        for name, (type_, help_) in METRICS.items():
+            lines.append(f'# HELP {name} {help_}')
+            lines.append(f'# TYPE {name} {type_}')
+            for (metric, labels), value in values:
+                if metric != name:
+                    continue
+                if labels:
+                    labels = ','.join(
+                        f'{label}="{escape(label_value)}"'
+                        for label, label_value in labels
+                    )
+                    metric = f'{metric}{{{labels}}}'
+                lines.append(f'{metric} {value:g}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n'
+    )
+
+
+REGISTRY = Registry()
+
+
+class RequestMetrics:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # alias: [queries, seconds] of every database used.
+        self.databases = defaultdict(lambda: [0, 0.0])
+        self.templates = defaultdict(float)
+        self.thumbnail_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def db_queries(self):
+        return sum(queries for queries, _ in self.databases.values())
+
+    @property
+    def db_time(self):
+        return sum(seconds for _, seconds in self.databases.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper, for connections of every alias."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            database = self.databases[context['connection'].alias]
+            database[0] += 1
+            database[1] += time.perf_counter() - started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_time * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'databases': {
+                alias: {'queries': queries, 'ms': round(seconds * 1000, 2)}
+                for alias, (queries, seconds) in self.databases.items()
+            },
+            'templates_ms': {
+                name: round(seconds * 1000, 2)
+                for name, seconds in self.templates.items()
+            },
+            'thumbnail_ms': round(self.thumbnail_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+
+def get_current():
+    """Metrics of the request handled by this thread or None."""
+    return getattr(_local, 'metrics', None)
+
+
+def set_current(metrics):
+    _local.metrics = metrics
+
+
+def count_cache(hits, misses):
+    metrics = get_current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+    if hits:
+        REGISTRY.inc('yatube_cache_requests_total', hits, result='hit')
+    if misses:
+        REGISTRY.inc('yatube_cache_requests_total', misses, result='miss')
+
+
+@contextmanager
+def thumbnail_timer():
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics = get_current()
+        if metrics is not None:
+            metrics.thumbnail_time += elapsed
+        REGISTRY.inc('yatube_thumbnail_seconds_total', elapsed)
+
+
+def instrument_templates():
+    """Time Template.render of every named template."""
+    render = Template.render
+    if getattr(render, 'instrumented', False):
+        return
+
+    def timed_render(self, context):
+        metrics = get_current()
+        if metrics is None or not self.name:
+            return render(self, context)
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.templates[self.name] += elapsed
+            REGISTRY.inc(
+                'yatube_template_seconds_total', elapsed, template=self.name
+            )
+
+    timed_render.instrumented = True
+    Template.render = timed_render
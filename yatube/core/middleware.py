@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+from contextlib import ExitStack, nullcontext
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .metrics import REGISTRY, RequestMetrics, set_current
+from .routers import PIN_MODELS, track_writes, use_primary
+
+logger = logging.getLogger(__name__)
+
+
+def server_timing(metrics):
+    """Server-Timing header value of the request metrics."""
+    entries = [
+        f'db;dur={metrics.db_time * 1000:.1f};'
+        f'desc="{metrics.db_queries} queries"',
+    ]
+    if set(metrics.databases) - {DEFAULT_DB_ALIAS}:
+        # Replicas were read, split the time by database.
+        entries += [
+            f'db-{alias};dur={seconds * 1000:.1f};desc="{queries} queries"'
+            for alias, (queries, seconds) in sorted(metrics.databases.items())
+        ]
+    for name, seconds in metrics.templates.items():
+        short = os.path.splitext(os.path.basename(name))[0]
+        entries.append(
+            f'tpl-{short};dur={seconds * 1000:.1f};desc="{name}"'
+        )
+    if metrics.thumbnail_time:
+        entries.append(f'thumbnail;dur={metrics.thumbnail_time * 1000:.1f}')
+    entries.append(
+        f'cache;desc="{metrics.cache_hits} hits, '
+        f'{metrics.cache_misses} misses"'
+    )
+    entries.append(f'total;dur={metrics.total_time * 1000:.1f}')
+
+    return ', '.join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Measures every request: Server-Timing header, a JSON log line
+    and totals for /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        set_current(metrics)
+        try:
+            with ExitStack() as stack:
+                for db in connections.all():
+                    stack.enter_context(db.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            set_current(None)
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else ''
+        response['Server-Timing'] = server_timing(metrics)
+        REGISTRY.inc('yatube_requests_total', view=view)
+        REGISTRY.inc(
+            'yatube_request_seconds_total', metrics.total_time, view=view
+        )
+        for alias, (queries, seconds) in metrics.databases.items():
+            REGISTRY.inc('yatube_db_queries_total', queries, alias=alias)
+            REGISTRY.inc('yatube_db_seconds_total', seconds, alias=alias)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }))
+
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pins a client that wrote posts, comments, follows or users to the
+    primary database with a short lived cookie.
+    """
+    cookie_name = 'db_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        pinned = self.cookie_name in request.COOKIES
+        with track_writes() as writes:
+            with use_primary() if pinned else nullcontext():
+                response = self.get_response(request)
+        if writes & PIN_MODELS:
+            response.set_cookie(
+                self.cookie_name, '1',
+                max_age=settings.DB_REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+
+        return response
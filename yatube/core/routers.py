@@ -0,0 +1,80 @@
+"""
+Read replica routing.
+
+Reads go to DATABASE_REPLICAS, writes to default. A client whose request
+wrote a post, comment, follow or user reads from default for the next
+DB_REPLICA_PIN_SECONDS, so it sees its own writes whatever the replica
+lag. Reads inside transactions, of sessions and those following a write
+in the same request always use default.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Writes to these models pin the writing client to default.
+PIN_MODELS = {'posts.post', 'posts.comment', 'posts.follow', 'auth.user'}
+# Apps read from default only, a fresh login must not look logged out.
+PRIMARY_APPS = {'sessions'}
+
+_local = threading.local()
+
+
+def is_pinned():
+    return getattr(_local, 'pinned', 0) > 0
+
+
+@contextmanager
+def use_primary():
+    """Read from default inside the block."""
+    _local.pinned = getattr(_local, 'pinned', 0) + 1
+    try:
+        yield
+    finally:
+        _local.pinned -= 1
+
+
+@contextmanager
+def track_writes():
+    """Collects labels of models written inside the block."""
+    previous = getattr(_local, 'writes', None)
+    _local.writes = writes = set()
+    try:
+        yield writes
+    finally:
+        _local.writes = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        if (
+            is_pinned()
+            or getattr(_local, 'writes', None)
+            or model._meta.app_label in PRIMARY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        if 'instance' in hints:
+            # Related objects come from where the instance came from.
+            return None
+
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        writes = getattr(_local, 'writes', None)
+        if writes is not None:
+            writes.add(model._meta.label_lower)
+
+        return DEFAULT_DB_ALIAS if settings.DATABASE_REPLICAS else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+
+        return None
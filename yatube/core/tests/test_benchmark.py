@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core import benchmark
+from posts.models import Comment, Follow, Post, User
+from posts.urls import urlpatterns as posts_urls
+from users.urls import urlpatterns as users_urls
+
+
+class BenchmarkTests(TestCase):
+    """Seeded data and measurements of every posts and users URL."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_data', users=8, groups=2, posts=60, comments=40,
+            follows=3, images=0, stdout=StringIO(),
+        )
+
+    def test_seed_data(self):
+        self.assertEqual(User.objects.count(), 8)
+        self.assertEqual(Post.objects.count(), 60)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_every_url_measured(self):
+        results = benchmark.run(repeats=2)
+        names = {key.split()[0] for key in results}
+        expected = {
+            f'{app}:{pattern.name}'
+            for app, patterns in (('posts', posts_urls), ('users', users_urls))
+            for pattern in patterns
+        }
+        self.assertEqual(names, expected)
+        for key, result in results.items():
+            with self.subTest(key=key):
+                self.assertLess(result['status'], 500)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_writes_undone(self):
+        """Runs leave comments and follows as they were."""
+        counts = Comment.objects.count(), Follow.objects.count()
+        reader = benchmark.get_reader()
+        follows = set(reader.follower.values_list('author_id', flat=True))
+        results = benchmark.run(repeats=2, names=[
+            'posts:add_comment', 'posts:profile_follow',
+            'posts:profile_unfollow',
+        ])
+        self.assertEqual(len(results), 6)
+        self.assertEqual(
+            (Comment.objects.count(), Follow.objects.count()), counts
+        )
+        self.assertEqual(
+            set(reader.follower.values_list('author_id', flat=True)), follows
+        )
+
+    def test_compare_flags_regressions(self):
+        base = {
+            'p95_ms': 10, 'cold_queries': 5, 'queries': 3, 'n_plus_one': 0,
+            'memory_kb': 500,
+        }
+        same = benchmark.compare({'posts:index guest': base}, {
+            'posts:index guest': base
+        })
+        self.assertEqual(same, [])
+        worse = dict(base, p95_ms=20, queries=4, memory_kb=1000)
+        regressions = benchmark.compare({'posts:index guest': worse}, {
+            'posts:index guest': base
+        })
+        self.assertEqual(len(regressions), 3)
+
+
+class EmptyBenchmarkTests(TestCase):
+    def test_no_users(self):
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            benchmark.get_samples()
+        with self.assertRaisesMessage(CommandError, 'seed_data'):
+            benchmark.get_reader()
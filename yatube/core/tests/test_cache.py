@@ -0,0 +1,171 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+from unittest import mock
+
+from django.core.cache.backends import locmem
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from core import cache as core_cache
+from core.cache import FileBasedCache, LocMemCache, get_or_refresh
+from core.metrics import REGISTRY
+
+
+def load_module(name):
+    """Fresh copy of the module, the imported one is left as it is."""
+    spec = importlib.util.find_spec(name)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+class StampedeTests(SimpleTestCase):
+    """One worker computes, the rest wait or serve the current value."""
+    def setUp(self):
+        self.cache = LocMemCache('stampede', {})
+        self.cache.clear()
+        REGISTRY.clear()
+
+    def test_herd_computes_once(self):
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'page'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                get_or_refresh('key', slow, 60, self.cache)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['page'] * 8)
+        self.assertEqual(
+            REGISTRY.get('yatube_cache_waits_total', result='filled'), 7
+        )
+
+    def test_early_refresh(self):
+        """Истекающее значение пересчитывает один, другим - старое."""
+        self.cache.set('key', ('old', time.time() - 1, 0.1), 60)
+        self.cache.add('lock:key', 1)
+        self.assertEqual(
+            get_or_refresh('key', lambda: 'new', 60, self.cache), 'old'
+        )
+        self.cache.delete('lock:key')
+        self.assertEqual(
+            get_or_refresh('key', lambda: 'new', 60, self.cache), 'new'
+        )
+        self.assertEqual(
+            REGISTRY.get('yatube_cache_refresh_total', reason='early'), 1
+        )
+
+    def test_wait_timeout(self):
+        """Если вычисляющий завис, ожидающий считает сам."""
+        self.cache.add('lock:key', 1)
+        with mock.patch.object(core_cache, 'WAIT_TIMEOUT', 0.1):
+            self.assertEqual(
+                get_or_refresh('key', lambda: 'page', 60, self.cache), 'page'
+            )
+        self.assertEqual(
+            REGISTRY.get('yatube_cache_waits_total', result='timeout'), 1
+        )
+
+    def test_none_kept_briefly(self):
+        get_or_refresh('key', lambda: None, 60, self.cache)
+        value, expires, _ = self.cache.get('key')
+        self.assertIsNone(value)
+        self.assertLessEqual(expires, time.time() + core_cache.NONE_TIMEOUT)
+        self.assertIsNone(self.cache.get('lock:key'))
+
+    def test_waiters_not_held_by_none(self):
+        """Ожидающие сразу получают None, а не ждут WAIT_TIMEOUT."""
+        def missing():
+            time.sleep(0.2)
+
+        holder = threading.Thread(
+            target=get_or_refresh, args=('key', missing, 60, self.cache)
+        )
+        holder.start()
+        time.sleep(0.05)
+        started = time.time()
+        self.assertIsNone(
+            get_or_refresh('key', lambda: 'page', 60, self.cache)
+        )
+        holder.join()
+        self.assertLess(time.time() - started, core_cache.WAIT_TIMEOUT / 2)
+        self.assertEqual(
+            REGISTRY.get('yatube_cache_waits_total', result='filled'), 1
+        )
+
+    def test_file_cache_is_instrumented(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        cache = FileBasedCache(directory, {})
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        cache.get('missing')
+        for result in ('hit', 'miss'):
+            with self.subTest(result=result):
+                self.assertEqual(
+                    REGISTRY.get('yatube_cache_requests_total', result=result),
+                    1,
+                )
+
+
+@mock.patch.dict(os.environ, {
+    'CACHE_BACKEND': 'redis', 'CACHE_LOCATION': 'redis://cache:6379/2'
+})
+class RedisBackendTests(SimpleTestCase):
+    """CACHE_BACKEND=redis, django-redis replaced by a local stand-in."""
+    def setUp(self):
+        REGISTRY.clear()
+
+    def stand_in(self):
+        package = types.ModuleType('django_redis')
+        package.cache = types.ModuleType('django_redis.cache')
+        # Takes (location, params) like django_redis.cache.RedisCache.
+        package.cache.RedisCache = locmem.LocMemCache
+
+        return {'django_redis': package, 'django_redis.cache': package.cache}
+
+    def test_missing_dependency(self):
+        with mock.patch.dict(sys.modules, {'django_redis': None}):
+            with self.assertRaisesMessage(
+                ImproperlyConfigured, 'django-redis'
+            ):
+                load_module('yatube.settings')
+
+    def test_backend(self):
+        with mock.patch.dict(sys.modules, self.stand_in()):
+            settings = load_module('yatube.settings')
+            module = load_module('core.cache')
+        config = settings.CACHES['default']
+        self.assertEqual(config['BACKEND'], 'core.cache.RedisCache')
+        self.assertEqual(config['LOCATION'], 'redis://cache:6379/2')
+        cache = module.RedisCache(config['LOCATION'], {})
+        self.assertEqual(
+            get_or_refresh('key', lambda: 'page', 60, cache), 'page'
+        )
+        self.assertEqual(
+            get_or_refresh('key', lambda: 'other', 60, cache), 'page'
+        )
+        for result in ('hit', 'miss'):
+            with self.subTest(result=result):
+                self.assertEqual(
+                    REGISTRY.get('yatube_cache_requests_total', result=result),
+                    1,
+                )
@@ -0,0 +1,73 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+
+from core.metrics import REGISTRY
+from posts.models import Post, User
+
+
+class MetricsTests(TestCase):
+    """Request instrumentation."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='metrics')
+        cls.post = Post.objects.create(author=cls.user, text='measure me')
+
+    def setUp(self):
+        cache.clear()
+        REGISTRY.clear()
+        self.guest_client = Client()
+
+    def test_server_timing(self):
+        """Response tells DB, template and cache time."""
+        response = self.guest_client.get('/')
+        timing = response['Server-Timing']
+        for entry in ('db;dur=', 'tpl-card;', 'tpl-paginator;', 'cache;',
+                      'total;dur='):
+            with self.subTest(entry=entry):
+                self.assertIn(entry, timing)
+        response = self.guest_client.get(f'/posts/{self.post.pk}/')
+        self.assertIn('tpl-comment_form;', response['Server-Timing'])
+
+    def test_log_line(self):
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.guest_client.get('/')
+            self.guest_client.get('/')
+        first, second = (
+            json.loads(output.split(':', 2)[2]) for output in logs.output
+        )
+        self.assertEqual(first['view'], 'posts:index')
+        self.assertGreater(first['db_queries'], 0)
+        self.assertIn('posts/includes/card.html', first['templates_ms'])
+        self.assertGreater(first['cache_misses'], 0)
+        self.assertGreater(second['cache_hits'], 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        """Prometheus text for the token bearer only."""
+        self.guest_client.get('/')
+        response = self.guest_client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'yatube_requests_total{view="posts:index"} 1',
+            response.content.decode(),
+        )
+        self.assertIn('yatube_cache_requests_total{result="miss"}',
+                      response.content.decode())
+        self.assertIn('yatube_db_queries_total{alias="default"}',
+                      response.content.decode())
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.guest_client.get('/metrics', **headers)
+                self.assertEqual(response.status_code, 404)
+
+    def test_metrics_off_without_token(self):
+        """Local addresses are not trusted, a proxy makes every one local."""
+        response = self.guest_client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 404)
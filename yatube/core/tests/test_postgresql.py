@@ -0,0 +1,148 @@
+from unittest import mock
+
+import psycopg2
+from django.test import SimpleTestCase
+
+from yatube.db.postgresql.base import DatabaseWrapper
+
+
+def connection_stub():
+    """Stand-in for a psycopg2 connection, works until told to fail."""
+    connection = mock.MagicMock(closed=0)
+    connection.info.transaction_status = (
+        psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    )
+    connection.close.side_effect = lambda: setattr(connection, 'closed', 1)
+
+    return connection
+
+
+def break_connection(connection):
+    error = psycopg2.OperationalError('server closed the connection')
+    cursor = connection.cursor.return_value
+    cursor.execute.side_effect = error
+    cursor.__enter__.return_value.execute.side_effect = error
+    connection.rollback.side_effect = error
+
+
+class PostgreSQLBackendTests(SimpleTestCase):
+    """
+    Пул и проверка соединений на подставных соединениях psycopg2,
+    настоящий PostgreSQL прогоняет весь набор тестов в CI.
+    """
+
+    def setUp(self):
+        self.connections = []
+        patcher = mock.patch('psycopg2.connect', side_effect=self.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def connect(self, *args, **kwargs):
+        self.connections.append(connection_stub())
+
+        return self.connections[-1]
+
+    def get_wrapper(self, **settings):
+        wrapper = DatabaseWrapper({
+            'ENGINE': 'yatube.db.postgresql',
+            'NAME': 'yatube',
+            'USER': '',
+            'PASSWORD': '',
+            'HOST': '',
+            'PORT': '',
+            'OPTIONS': {},
+            'ATOMIC_REQUESTS': False,
+            'AUTOCOMMIT': True,
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'TIME_ZONE': None,
+            'TEST': {},
+            **settings,
+        }, alias='stub')
+        self.addCleanup(wrapper.close_pool)
+
+        return wrapper
+
+    def test_pool_checkout_and_return(self):
+        wrapper = self.get_wrapper(POOL_SIZE=2)
+        other = self.get_wrapper(POOL_SIZE=2)
+        wrapper.connect()
+        other.connect()
+        self.assertEqual(len(self.connections), 2)
+        self.assertIsNot(wrapper.connection, other.connection)
+        used = {wrapper.connection, other.connection}
+        wrapper.close()
+        other.close()
+        self.assertIsNone(wrapper.connection)
+        wrapper.connect()
+        other.connect()
+        self.assertEqual({wrapper.connection, other.connection}, used)
+        self.assertEqual(len(self.connections), 2)
+        self.assertFalse(any(c.close.called for c in self.connections))
+
+    def test_released_at_end_of_request(self):
+        """With CONN_MAX_AGE = 0 the connection goes back to the pool."""
+        wrapper = self.get_wrapper(POOL_SIZE=1)
+        wrapper.connect()
+        connection = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
+        connection.close.assert_not_called()
+        wrapper.connect()
+        self.assertIs(wrapper.connection, connection)
+
+    def test_broken_connection_is_not_returned(self):
+        wrapper = self.get_wrapper(POOL_SIZE=1)
+        wrapper.connect()
+        connection = wrapper.connection
+        break_connection(connection)
+        wrapper.close()
+        connection.close.assert_called_once()
+        wrapper.connect()
+        self.assertIsNot(wrapper.connection, connection)
+
+    def test_dead_pooled_connections_are_replaced(self):
+        """After a server restart checkout skips every dead idle one."""
+        wrapper = self.get_wrapper(POOL_SIZE=2)
+        other = self.get_wrapper(POOL_SIZE=2)
+        wrapper.connect()
+        other.connect()
+        wrapper.close()
+        other.close()
+        dead = list(self.connections)
+        for connection in dead:
+            break_connection(connection)
+        wrapper.connect()
+        self.assertNotIn(wrapper.connection, dead)
+        self.assertTrue(all(c.closed for c in dead))
+
+    def test_reconnect_after_failed_health_check(self):
+        wrapper = self.get_wrapper(CONN_MAX_AGE=60)
+        wrapper.ensure_connection()
+        connection = wrapper.connection
+        # End of a request: kept connection, checked on the next use.
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIs(wrapper.connection, connection)
+        break_connection(connection)
+        wrapper.cursor()
+        self.assertIsNot(wrapper.connection, connection)
+        self.assertEqual(len(self.connections), 2)
+        connection.close.assert_called_once()
+        checks = wrapper.connection.cursor.return_value.execute.call_count
+        wrapper.cursor()
+        self.assertEqual(
+            wrapper.connection.cursor.return_value.execute.call_count, checks
+        )
+
+    def test_pool_follows_changed_settings(self):
+        """The test runner switches NAME, the old pool is closed."""
+        wrapper = self.get_wrapper(POOL_SIZE=1)
+        wrapper.connect()
+        connection = wrapper.connection
+        wrapper.close()
+        wrapper.settings_dict['NAME'] = 'test_yatube'
+        wrapper.connect()
+        self.assertIsNot(wrapper.connection, connection)
+        self.assertTrue(connection.closed)
+        wrapper.close_pool()
+        self.assertTrue(wrapper.connection.closed)
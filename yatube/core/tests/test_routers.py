@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from core.metrics import REGISTRY
+from core.middleware import ReplicaRoutingMiddleware
+from core.routers import (
+    ReplicaRouter,
+    is_pinned,
+    track_writes,
+    use_primary,
+)
+from posts.models import Comment, Follow, Post, User
+from posts.queries import QueryRecorder
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DB_REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Reads from replicas and read-your-writes."""
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_routing(self):
+        """Чтения идут в реплику, записи и чтения после пина - в default."""
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        with track_writes():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.router.db_for_write(Comment)
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Без реплик роутер не вмешивается."""
+        self.assertIsNone(self.router.db_for_read(Post))
+        self.assertIsNone(self.router.db_for_write(Post))
+
+    def test_write_pins_client(self):
+        """После подписки или комментария клиент читает из default."""
+        for model in (Follow, Comment):
+            with self.subTest(model=model.__name__):
+                def write(request):
+                    self.router.db_for_write(model)
+
+                    return HttpResponse()
+
+                middleware = ReplicaRoutingMiddleware(write)
+                response = middleware(self.factory.get('/'))
+                self.assertIn(middleware.cookie_name, response.cookies)
+
+        middleware = ReplicaRoutingMiddleware(
+            lambda request: HttpResponse(is_pinned())
+        )
+        request = self.factory.get('/')
+        self.assertEqual(middleware(request).content, b'False')
+        request.COOKIES[middleware.cookie_name] = '1'
+        self.assertEqual(middleware(request).content, b'True')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], DB_REPLICA_PIN_SECONDS=5)
+class ReplicaReadsTests(TransactionTestCase):
+    """
+    Requests read from the replica unless the client has just written.
+    Reads inside a transaction stay on default, so the test commits.
+    """
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='writer'))
+
+    def get(self, client, address):
+        with QueryRecorder() as recorder:
+            response = client.get(address)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+        return recorder.aliases
+
+    def test_reads_after_write_use_default(self):
+        self.client.post(reverse('posts:post_create'), {'text': 'new'})
+        self.assertEqual(
+            self.get(self.client, reverse('posts:index')), {'default'}
+        )
+
+    def test_anonymous_reads_use_replica(self):
+        # First render stores the post counter in default.
+        Client().get(reverse('posts:index'))
+        cache.clear()
+        self.assertEqual(
+            self.get(Client(), reverse('posts:index')), {'replica1'}
+        )
+
+    def test_replica_reads_measured(self):
+        """Server-Timing and /metrics count replica queries by alias."""
+        REGISTRY.clear()
+        response = Client().get(reverse('posts:index'))
+        self.assertIn('db-replica1;dur=', response['Server-Timing'])
+        self.assertGreater(
+            REGISTRY.get('yatube_db_queries_total', alias='replica1'), 0
+        )
@@ -0,0 +1,29 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from yatube.db.sqlite3.base import DEFAULT_PRAGMAS
+
+
+@skipUnless(
+    connection.settings_dict['ENGINE'] == 'yatube.db.sqlite3',
+    'Tuned SQLite backend only.',
+)
+class SQLiteTuningTest(TestCase):
+    def get_pragma(self, pragma):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {pragma}')
+
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из DEFAULT_PRAGMAS."""
+        # 1 is NORMAL.
+        self.assertEqual(self.get_pragma('synchronous'), 1)
+        self.assertEqual(
+            self.get_pragma('cache_size'), DEFAULT_PRAGMAS['cache_size']
+        )
+        self.assertEqual(
+            self.get_pragma('busy_timeout'), DEFAULT_PRAGMAS['busy_timeout']
+        )
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import REGISTRY
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +17,20 @@ def csrf_failure(request, reason=''):
 
 def server_failure(request):
     return render(request, 'core/500.html')
+
+
+def metrics(request):
+    """
+    Prometheus metrics of this process, for the METRICS_TOKEN bearer only.
+    Behind a proxy every client is local, so addresses are not trusted.
+    """
+    token = settings.METRICS_TOKEN
+    supplied = request.META.get('HTTP_AUTHORIZATION', '')
+    if not token or not hmac.compare_digest(
+        supplied.encode(), f'Bearer {token}'.encode()
+    ):
+        raise Http404
+
+    return HttpResponse(
+        REGISTRY.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -1,6 +1,21 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import SEARCH_VAR
+from django.db.models import Case, IntegerField, Value, When
 
-from .models import Post, Group, Follow
+from .constants import ADMIN_SEARCH_LIMIT
+from .models import Comment, Post, Group, Follow
+from .paginators import EstimatedCountPaginator
+from .search import get_backend
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist of a big table: estimated counts, no full count
+    next to search results, related objects picked by autocomplete.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
 
 
 @admin.register(Group)
@@ -20,9 +35,11 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     """
     Config for Post Model in admin panel.
+    Search goes to the full-text index instead of LIKE scans,
+    results keep its ranking unless a column is sorted.
     """
     list_display = (
         'pk',
@@ -31,18 +48,64 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
+    # Date ranges served by the created index, date_hierarchy would
+    # aggregate dates of the whole table.
     list_filter = ('created',)
-    empty_value_display = '-пусто-'
-    list_editable = ('group',)
+    autocomplete_fields = ('author', 'group')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        found = [
+            pk for _, pk in get_backend().search(
+                search_term, ADMIN_SEARCH_LIMIT
+            )
+        ]
+        queryset = queryset.filter(pk__in=found).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(i)) for i, pk in enumerate(found)],
+                output_field=IntegerField(),
+            )
+        )
+
+        return queryset, False
+
+    def get_ordering(self, request):
+        if request.GET.get(SEARCH_VAR):
+            return ('search_rank',)
+
+        return super().get_ordering(request)
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'created',
+        'author',
+        'post',
+    )
+    list_select_related = ('author', 'post')
+    # Exact username match uses the unique index.
+    search_fields = ('=author__username',)
+    list_filter = ('created',)
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post',)
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     """
     I dont know what i'm doing anymore.
     """
     list_display = (
         'pk',
+        'user',
         'author',
     )
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    autocomplete_fields = ('user', 'author')
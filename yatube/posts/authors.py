@@ -0,0 +1,131 @@
+"""
+Slim author records cached by id, with username -> id index.
+
+Profile pages, follow links and post cards need only the name and the
+counters of an author, not the User row with its profile, as_user()
+turns a record into a User with the profile attached. Records are
+forgotten by signals when the user is saved or their counters change,
+the username index is checked against the record, so renames are safe.
+"""
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.http import Http404
+
+from core.cache import invalidate
+from users.models import Profile
+from .constants import AUTHOR_CACHE_TIMEOUT
+from .models import User
+
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+PROFILE_FIELDS = ('posts_count', 'followers_count', 'following_count')
+COLUMNS = (
+    'pk',
+    'username',
+    'first_name',
+    'last_name',
+    'profile__pk',
+    'profile__posts_count',
+    'profile__followers_count',
+    'profile__following_count',
+)
+
+
+class Author(NamedTuple):
+    pk: int
+    username: str
+    first_name: str
+    last_name: str
+    profile_pk: int
+    posts_count: int
+    followers_count: int
+    following_count: int
+
+    def __str__(self):
+        return self.username
+
+    def get_full_name(self):
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def as_user(self):
+        """User with only the record fields loaded, others are deferred."""
+        user = User.from_db(None, USER_FIELDS, self[:len(USER_FIELDS)])
+        counters = self[-len(PROFILE_FIELDS):]
+        if self.profile_pk is None:
+            user.profile = Profile(
+                user=user, **dict(zip(PROFILE_FIELDS, counters))
+            )
+        else:
+            user.profile = Profile.from_db(
+                None,
+                ('id', 'user_id', *PROFILE_FIELDS),
+                (self.profile_pk, self.pk, *counters),
+            )
+
+        return user
+
+
+def record_key(pk):
+    return f'author_record:{pk}'
+
+
+def username_key(username):
+    return f'author_id:{username}'
+
+
+def load(**lookups):
+    """Records of users matching lookups, saved to cache."""
+    authors = [
+        # Counters of users without a profile are NULL.
+        Author(*row[:5], *(count or 0 for count in row[5:]))
+        for row in User.objects.filter(**lookups).values_list(*COLUMNS)
+    ]
+    cache.set_many(
+        {record_key(author.pk): author for author in authors},
+        AUTHOR_CACHE_TIMEOUT,
+    )
+
+    return authors
+
+
+def get_authors(ids):
+    """{id: Author} of existing users among ids."""
+    ids = set(ids)
+    found = cache.get_many([record_key(pk) for pk in ids])
+    authors = {author.pk: author for author in found.values()}
+    missing = ids - set(authors)
+    if missing:
+        authors.update(
+            (author.pk, author) for author in load(pk__in=missing)
+        )
+
+    return authors
+
+
+def get_author(username):
+    """Author record by username, Http404 if there is no such user."""
+    pk = cache.get(username_key(username))
+    if pk is not None:
+        author = get_authors([pk]).get(pk)
+        if author is not None and author.username == username:
+            return author
+    authors = load(username=username)
+    if not authors:
+        raise Http404('No User matches the given query.')
+    author = authors[0]
+    cache.set(username_key(username), author.pk, AUTHOR_CACHE_TIMEOUT)
+
+    return author
+
+
+def attach_authors(posts):
+    """Set post.author_record of the posts."""
+    posts = list(posts)
+    authors = get_authors({post.author_id for post in posts})
+    for post in posts:
+        post.author_record = authors.get(post.author_id)
+
+
+def forget(ids):
+    """Drop cached records, next read loads them again."""
+    invalidate(cache.delete_many, [record_key(pk) for pk in ids])
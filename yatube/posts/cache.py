@@ -0,0 +1,143 @@
+"""
+Conditional GET and full-page cache for anonymous visitors.
+
+Every cached page belongs to scopes ('site', 'posts', 'group:<slug>',
+'author:<username>', 'feed:<reader id>'). A scope has a generation, the
+time of its last change, kept in the cache. Signals bump generations when
+content of the scope changes, so stale pages are never served and are
+simply left to expire. Pages are validated by ETag only: Last-Modified has
+whole seconds and would miss two changes within one second.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from core.cache import get_or_refresh, invalidate
+from .constants import PAGE_CACHE_TIMEOUT
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def feed_scope(user_id):
+    return f'feed:{user_id}'
+
+
+def get_generations(scopes):
+    """Generation of each scope, missing ones start now."""
+    keys = [f'generation:{scope}' for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+
+    return [generations[key] for key in keys]
+
+
+def set_generations(keys):
+    now = time.time()
+    cache.set_many({key: now for key in keys}, None)
+
+
+def bump(scopes):
+    """Start new generation of the scopes, once more on commit."""
+    invalidate(set_generations, [f'generation:{scope}' for scope in scopes])
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GET with 304 before running the view.
+    Subclasses describe the page state with get_validators().
+    """
+
+    def get_validators(self):
+        """Key of the page state for the ETag, None to skip."""
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        key = None
+        if request.method in ('GET', 'HEAD'):
+            key = self.get_validators()
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.page_key = hashlib.md5(key.encode()).hexdigest()
+        etag = quote_etag(self.page_key)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_page_response(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            patch_vary_headers(response, ('Cookie',))
+
+        return response
+
+    def get_page_response(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ScopeConditionalGetMixin(ConditionalGetMixin):
+    """Validates pages by generations of their scopes."""
+
+    def get_page_scopes(self):
+        return []
+
+    def get_validators(self):
+        scopes = ['site', *self.get_page_scopes()]
+        user = self.request.user
+        # Follow links on the cards change with the viewer's follows.
+        if user.is_authenticated and feed_scope(user.pk) not in scopes:
+            scopes.append(feed_scope(user.pk))
+        generations = get_generations(scopes)
+        key = '|'.join(map(str, (
+            self.request.get_full_path(),
+            self.request.user.pk,
+            *generations,
+        )))
+
+        return key
+
+
+class AnonymousPageCacheMixin(ScopeConditionalGetMixin):
+    """
+    Serves whole pages to anonymous visitors from cache. A page is
+    rendered by one worker at a time and refreshed before it expires.
+    """
+
+    def get_page_response(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get_page_response(request, *args, **kwargs)
+
+        get_page_response = super().get_page_response
+        rendered = []
+
+        def render():
+            response = get_page_response(request, *args, **kwargs)
+            rendered.append(response)
+            if response.status_code != 200:
+                return None
+            response.render()
+
+            return response.content, response['Content-Type']
+
+        cached = get_or_refresh(
+            f'page:{self.page_key}', render, PAGE_CACHE_TIMEOUT
+        )
+        if rendered:
+            return rendered[0]
+        if cached is None:
+            # Not a 200 page, redirects and 404 are not cached.
+            return get_page_response(request, *args, **kwargs)
+        content, content_type = cached
+
+        return HttpResponse(content, content_type=content_type)
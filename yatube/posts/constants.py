@@ -8,6 +8,56 @@ CUT_POSTS_NUM: int = 10
 PAGES: int = 10
 CUT_STR_POST = 15
 
+# follow feed:
+# authors with at least this many followers are not fanned out on write,
+# their posts are merged into the feed at read time instead.
+FEED_FANOUT_LIMIT: int = 1000
+FEED_BATCH_SIZE: int = 500
+
+# anonymous page cache lifetime (seconds), generations invalidate it sooner.
+PAGE_CACHE_TIMEOUT: int = 60 * 10
+
+# cached author records lifetime (seconds), signals forget them sooner.
+AUTHOR_CACHE_TIMEOUT: int = 60 * 60 * 24
+# cached ids of followed authors lifetime (seconds), signals forget them.
+FOLLOW_SET_CACHE_TIMEOUT: int = 60 * 60 * 24
+
+# comments on post detail page and in every "load more" fragment.
+COMMENTS_PAGE: int = 20
+
+# export: rows fetched from the database at a time
+# and characters sent to the client at a time.
+EXPORT_CHUNK_SIZE: int = 2000
+EXPORT_BUFFER_SIZE: int = 64 * 1024
+
+# post counters older than this (seconds) are recounted on read.
+COUNTER_TTL: int = 60 * 60
+
+# post image thumbnails, variants keep THUMBNAIL_GEOMETRY proportions:
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WIDTHS = (480, 960)
+THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+
+# queries of the same shape repeated this many times in a request are N+1.
+N_PLUS_ONE_REPEATS: int = 3
+# most queries a posts view may run, checked by QueryBudgetMiddleware,
+# cold caches, counters and thumbnail lookups of image posts included.
+QUERY_BUDGETS = {
+    'posts:index': 9,
+    'posts:group_list': 10,
+    'posts:profile': 9,
+    'posts:post_detail': 6,
+    'posts:comments': 4,
+    'posts:follow_index': 11,
+    'posts:search': 7,
+}
+
+# admin changelists count filtered rows up to this many.
+ADMIN_COUNT_LIMIT: int = 10000
+# admin post search shows this many best matches.
+ADMIN_SEARCH_LIMIT: int = 500
+
 
 # constants for tests:
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
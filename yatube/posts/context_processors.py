@@ -0,0 +1,8 @@
+from .follows import get_follow_set
+
+
+def viewer_follows(request):
+    """Авторы, на которых подписан пользователь, без запроса до проверки."""
+    return {
+        'viewer_follows': get_follow_set(request),
+    }
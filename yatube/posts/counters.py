@@ -0,0 +1,111 @@
+"""
+Post counters.
+
+Scope counters are strings: 'posts' for all posts, 'group:<id>',
+'author:<id>' and 'feed:<user id>'. Signals shift them on post create,
+edit and delete; a counter is recounted when missing or older than
+COUNTER_TTL, which also heals drift from bulk operations that skip signals.
+
+Denormalized counter columns on Group, Post and Profile are shifted
+by the same signals and recomputed by the reconcile_counters command.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .constants import COUNTER_TTL, FEED_BATCH_SIZE
+from .models import Counter, FeedEntry, Post
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def feed_scope(user_id):
+    return f'feed:{user_id}'
+
+
+def post_scopes(post):
+    """Scopes the post is counted in, follow feeds aside."""
+    scopes = ['posts', author_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(group_scope(post.group_id))
+
+    return scopes
+
+
+def scope_queryset(scope):
+    name, _, pk = scope.partition(':')
+    if name == 'group':
+        return Post.objects.filter(group_id=pk)
+    if name == 'author':
+        return Post.objects.filter(author_id=pk)
+    if name == 'feed':
+        return FeedEntry.objects.filter(user_id=pk)
+
+    return Post.objects.all()
+
+
+def get_count(scopes):
+    """Total of the counters, recounting missing and stale ones."""
+    now = timezone.now()
+    fresh_after = now - timedelta(seconds=COUNTER_TTL)
+    counters = Counter.objects.filter(scope__in=scopes).in_bulk(
+        field_name='scope'
+    )
+    total = 0
+    for scope in scopes:
+        counter = counters.get(scope)
+        if counter is None:
+            counter = Counter(scope=scope, value=scope_queryset(scope).count())
+            # A concurrent request may have counted it, both are right.
+            Counter.objects.bulk_create([counter], ignore_conflicts=True)
+        elif counter.counted < fresh_after:
+            counter.value = scope_queryset(scope).count()
+            Counter.objects.filter(pk=counter.pk).update(
+                value=counter.value, counted=now
+            )
+        total += counter.value
+
+    return total
+
+
+def change(scopes, delta):
+    """Shift existing counters, missing ones are counted on read."""
+    scopes = list(scopes)
+    for start in range(0, len(scopes), FEED_BATCH_SIZE):
+        Counter.objects.filter(
+            scope__in=scopes[start:start + FEED_BATCH_SIZE]
+        ).update(value=F('value') + delta)
+
+
+def reset(scopes):
+    """Forget counters so they are recounted on next read."""
+    Counter.objects.filter(scope__in=scopes).delete()
+
+
+def shift(queryset, field, delta):
+    """Shift a counter column of the queryset rows, never below zero."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_of(queryset, field, outer='pk'):
+    """Correlated COUNT of queryset rows pointing at the outer row."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef(outer)})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
@@ -0,0 +1,220 @@
+"""
+Streaming export of posts and comments of a user or a group.
+
+Rows are read with iterator(chunk_size=EXPORT_CHUNK_SIZE) and encoded as
+they come, so memory use does not grow with the number of posts. Without
+server-side cursors (pgbouncer) iterator() would fetch every row at once,
+there rows are read by keyset pages of EXPORT_CHUNK_SIZE instead. Formats
+are NDJSON, an object per line, and CSV with a 'type' column. stream_zip()
+packs the rows and the post images into a zip written on the fly.
+"""
+import csv
+import io
+import json
+import logging
+import time
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import Q
+
+from .constants import EXPORT_BUFFER_SIZE, EXPORT_CHUNK_SIZE
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('type', 'id', 'post', 'author', 'group', 'text', 'created', 'image')
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def streams_rows(db):
+    """True if iterator() of the database keeps only a chunk in memory."""
+    connection = connections[db]
+    if connection.vendor == 'postgresql':
+        return not connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+
+    return connection.vendor == 'sqlite'
+
+
+def read(queryset, after):
+    """
+    Rows of the ordered queryset, EXPORT_CHUNK_SIZE at a time.
+    after(row) filters the rows following the row, for keyset pages.
+    """
+    if streams_rows(queryset.db):
+        yield from queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return
+    page = queryset
+    while True:
+        rows = list(page[:EXPORT_CHUNK_SIZE])
+        yield from rows
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        page = queryset.filter(after(rows[-1]))
+
+
+def after_created(row):
+    """Rows ordered by (created, pk) after the row starting with them."""
+    created, pk = row[:2]
+
+    return Q(created__gt=created) | Q(created=created, pk__gt=pk)
+
+
+def after_image(row):
+    return Q(image__gt=row[0])
+
+
+class Export:
+    """Posts and comments of the user or of the group."""
+
+    def __init__(self, user=None, group=None):
+        if (user is None) == (group is None):
+            raise ValueError('Export needs either a user or a group.')
+        self.user = user
+        self.group = group
+
+    @property
+    def name(self):
+        return self.user.username if self.user else f'group-{self.group.slug}'
+
+    def get_posts(self):
+        if self.user:
+            return Post.objects.filter(author=self.user)
+
+        return Post.objects.filter(group=self.group)
+
+    def get_comments(self):
+        if self.user:
+            return Comment.objects.filter(author=self.user)
+
+        return Comment.objects.filter(post__group=self.group)
+
+    def rows(self):
+        posts = self.get_posts().order_by('created', 'pk').values_list(
+            'created', 'pk', 'author__username', 'group__slug', 'text',
+            'image',
+        )
+        for created, pk, author, group, text, image in read(
+            posts, after_created
+        ):
+            yield {
+                'type': 'post', 'id': pk, 'post': None, 'author': author,
+                'group': group, 'text': text,
+                'created': created.isoformat(), 'image': image or None,
+            }
+        comments = self.get_comments().order_by('created', 'pk').values_list(
+            'created', 'pk', 'post_id', 'author__username', 'text',
+        )
+        for created, pk, post, author, text in read(
+            comments, after_created
+        ):
+            yield {
+                'type': 'comment', 'id': pk, 'post': post, 'author': author,
+                'group': None, 'text': text,
+                'created': created.isoformat(), 'image': None,
+            }
+
+    def images(self):
+        """Names of the post images, each once."""
+        names = self.get_posts().exclude(image='').exclude(
+            image__isnull=True
+        ).order_by('image').values_list('image').distinct()
+        for name, in read(names, after_image):
+            yield name
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def encode_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def encode_csv(rows):
+    writer = csv.DictWriter(Echo(), FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def buffered(lines, size=EXPORT_BUFFER_SIZE):
+    """Lines joined into strings of about size characters."""
+    buffer = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream(export, format_):
+    """Text of the export in the format, in pieces."""
+    encode = {'ndjson': encode_ndjson, 'csv': encode_csv}[format_]
+
+    return buffered(encode(export.rows()))
+
+
+class ZipStream(io.RawIOBase):
+    """Unseekable file zipfile writes to, pop() takes what was written."""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+
+        return data
+
+
+def stream_zip(export, format_):
+    """
+    Zip with export.<format> and images/<name> of the post images,
+    in pieces. Images are stored as they are, they are compressed already.
+    """
+    output = ZipStream()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f'export.{format_}', 'w', force_zip64=True) as file:
+            for text in stream(export, format_):
+                file.write(text.encode())
+                yield output.pop()
+        for name in export.images():
+            try:
+                source = default_storage.open(name)
+            except OSError:
+                logger.warning(
+                    'Export %s: image %s is missing', export.name, name
+                )
+                continue
+            info = zipfile.ZipInfo(
+                f'images/{name}', time.localtime()[:6]
+            )
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w', force_zip64=True) as file:
+                for chunk in source.chunks():
+                    file.write(chunk)
+                    yield output.pop()
+    yield output.pop()
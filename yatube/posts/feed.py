@@ -0,0 +1,143 @@
+"""
+Materialized follow feed.
+
+Posts are fanned out to FeedEntry rows of every follower when published,
+so the follow page reads one index range instead of joining Follow and Post.
+Authors with FEED_FANOUT_LIMIT followers or more are not fanned out,
+their posts are merged into the feed at read time. When an author drops
+below the limit the posts are written into the feeds later by the
+backfill_feeds command, in batches, and merged at read time until then.
+"""
+from itertools import islice
+
+from django.db.models import Q
+
+from users.models import Profile
+from . import counters
+from .constants import FEED_BATCH_SIZE, FEED_FANOUT_LIMIT
+from .models import FeedEntry, Follow, Post
+
+
+def followers_count(author_id):
+    return Profile.objects.filter(
+        user_id=author_id
+    ).values_list('followers_count', flat=True).first() or 0
+
+
+def is_heavy(author_id):
+    """Author has too many followers to be fanned out on write."""
+    return followers_count(author_id) >= FEED_FANOUT_LIMIT
+
+
+def heavy_author_ids(user):
+    """Followed authors merged at read time: heavy or not backfilled."""
+    return Follow.objects.filter(
+        Q(author__profile__followers_count__gte=FEED_FANOUT_LIMIT)
+        | Q(author__profile__feed_backfill=True),
+        user=user,
+    ).values_list('author', flat=True)
+
+
+def _write_entries(user_ids, posts):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id, created=created)
+            for user_id in user_ids
+            for post_id, created in posts
+        ],
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Push new post into the feeds of author's followers."""
+    if is_heavy(post.author_id):
+        return
+    followers = list(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)
+    )
+    _write_entries(followers, [(post.pk, post.created)])
+    counters.change([counters.feed_scope(pk) for pk in followers], 1)
+
+
+def backfill(user_id, author_id):
+    """Copy author's posts into the feed of a new follower."""
+    if is_heavy(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'created')
+    _write_entries([user_id], posts)
+    counters.reset([counters.feed_scope(user_id)])
+
+
+def prune(user_id, author_id):
+    """Drop author's posts from the feed of an ex-follower."""
+    FeedEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+    counters.reset([counters.feed_scope(user_id)])
+    # Author just stopped being heavy: posts written meanwhile were
+    # never fanned out, backfill_feeds writes them outside the request.
+    if followers_count(author_id) == FEED_FANOUT_LIMIT - 1:
+        Profile.objects.filter(user_id=author_id).update(feed_backfill=True)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def complete_backfill(author_id):
+    """
+    Write posts of the author, who stopped being heavy, into the feeds
+    of the followers FEED_BATCH_SIZE rows at a time, then stop merging
+    them at read time. Posts and follows made meanwhile are written
+    by fan_out() and backfill() as usual.
+    """
+    if not is_heavy(author_id):
+        followers = list(
+            Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True)
+        )
+        posts = Post.objects.filter(
+            author_id=author_id
+        ).order_by('pk').values_list('pk', 'created')
+        for batch in chunks(
+            posts.iterator(chunk_size=FEED_BATCH_SIZE), FEED_BATCH_SIZE
+        ):
+            for user_id in followers:
+                _write_entries([user_id], batch)
+        # Readers who unfollowed while the batches were written.
+        FeedEntry.objects.filter(post__author_id=author_id).exclude(
+            user_id__in=Follow.objects.filter(
+                author_id=author_id
+            ).values('user_id')
+        ).delete()
+        counters.reset([counters.feed_scope(pk) for pk in followers])
+    Profile.objects.filter(user_id=author_id).update(feed_backfill=False)
+
+
+def get_feed(user, heavy=()):
+    """
+    Posts of authors the user follows, newest first.
+    heavy are ids of followed heavy authors merged at read time.
+    """
+    if not heavy:
+        return Post.objects.filter(
+            feed_entries__user=user
+        ).order_by('-feed_entries__created')
+
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author_id__in=heavy)
+    )
@@ -0,0 +1,72 @@
+"""
+Authors the viewer follows, loaded once per request.
+
+get_follow_set(request) is shared by the views and templates of a request
+('viewer_follows' in templates), ids are read on first membership test
+with one query, or from the cache with POSTS_FOLLOW_SET_CACHE. They are
+cached as a compact array and forgotten by signals on follow changes.
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import cached_property
+
+from core.cache import invalidate
+from .constants import FOLLOW_SET_CACHE_TIMEOUT
+from .models import Follow
+
+
+def follow_set_key(user_id):
+    return f'follow_set:{user_id}'
+
+
+def load_ids(user_id):
+    if not settings.POSTS_FOLLOW_SET_CACHE:
+        return Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+    key = follow_set_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array('q', Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True))
+        cache.set(key, ids, FOLLOW_SET_CACHE_TIMEOUT)
+
+    return ids
+
+
+def forget(user_ids):
+    invalidate(cache.delete_many, [follow_set_key(pk) for pk in user_ids])
+
+
+class FollowSet:
+    """`author_id in follow_set` without a query per author."""
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def ids(self):
+        if not self.user.is_authenticated:
+            return frozenset()
+
+        return frozenset(load_ids(self.user.pk))
+
+    def __contains__(self, author_id):
+        return author_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+
+def get_follow_set(request):
+    """FollowSet of request.user, one per request."""
+    if not hasattr(request, '_follow_set'):
+        request._follow_set = FollowSet(request.user)
+
+    return request._follow_set
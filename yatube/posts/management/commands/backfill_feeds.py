@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Дописывает в ленты подписчиков посты авторов, которые перестали '
+        'быть популярными. До этого их посты подмешиваются в ленты при '
+        'чтении. Запускайте по расписанию.'
+    )
+
+    def handle(self, *args, **options):
+        authors = list(
+            Profile.objects.filter(
+                feed_backfill=True
+            ).values_list('user_id', flat=True)
+        )
+        for author_id in authors:
+            feed.complete_backfill(author_id)
+        self.stdout.write(f'Дописаны ленты авторов: {len(authors)}.')
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS, Export, stream, stream_zip
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты и комментарии пользователя или группы в NDJSON '
+        'или CSV, с --images вместе с картинками в zip. Память не растёт '
+        'с числом постов, строки пишутся по мере чтения.'
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--user', help='Имя пользователя.')
+        target.add_argument('--group', help='Slug группы.')
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson', dest='format_'
+        )
+        parser.add_argument(
+            '--images', action='store_true',
+            help='Zip с выгрузкой и картинками постов, нужен --output.'
+        )
+        parser.add_argument(
+            '--output', help='Файл выгрузки, по умолчанию stdout.'
+        )
+
+    def get_export(self, username, slug):
+        try:
+            if username:
+                return Export(user=User.objects.get(username=username))
+            return Export(group=Group.objects.get(slug=slug))
+        except (User.DoesNotExist, Group.DoesNotExist):
+            raise CommandError(f'Не найден: {username or slug}.')
+
+    def handle(self, *args, **options):
+        export = self.get_export(options['user'], options['group'])
+        format_ = options['format_']
+        output = options['output']
+        if options['images']:
+            if not output:
+                raise CommandError('Zip пишется в файл, укажите --output.')
+            with open(output, 'wb') as file:
+                for data in stream_zip(export, format_):
+                    file.write(data)
+        elif output:
+            with open(output, 'w', newline='') as file:
+                for text in stream(export, format_):
+                    file.write(text)
+        else:
+            for text in stream(export, format_):
+                self.stdout.write(text, ending='')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры картинок постов.'
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        generated = 0
+        for image in images.iterator():
+            ready = thumbnails.get_ready_thumbnail(image)
+            if ready is None or len(ready.variants) < len(thumbnails.VARIANTS):
+                thumbnails.generate(image)
+                generated += 1
+        self.stdout.write(f'Создано миниатюр: {generated}.')
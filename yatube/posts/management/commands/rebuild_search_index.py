@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс постов.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.install()
+        backend.rebuild()
+        self.stdout.write('Поисковый индекс перестроен.')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import authors
+from posts.counters import count_of
+from posts.models import Comment, Counter, Follow, Group, Post, User
+from users.models import Profile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        missing = User.objects.filter(
+            profile__isnull=True
+        ).values_list('pk', flat=True)
+        created = Profile.objects.bulk_create(
+            [Profile(user_id=pk) for pk in missing]
+        )
+        groups = Group.objects.update(
+            posts_count=count_of(Post.objects, 'group')
+        )
+        posts = Post.objects.update(
+            comments_count=count_of(Comment.objects, 'post')
+        )
+        profiles = Profile.objects.update(
+            posts_count=count_of(Post.objects, 'author', outer='user_id'),
+            followers_count=count_of(
+                Follow.objects, 'author', outer='user_id'
+            ),
+            following_count=count_of(Follow.objects, 'user', outer='user_id'),
+        )
+        # Scope counters are recounted lazily on next read.
+        scopes, _ = Counter.objects.all().delete()
+        authors.forget(User.objects.values_list('pk', flat=True))
+        self.stdout.write(
+            f'Групп: {groups}, постов: {posts}, профилей: {profiles} '
+            f'(создано {len(created)}), сброшено счётчиков: {scopes}.'
+        )
@@ -0,0 +1,244 @@
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from PIL import Image
+
+from posts.constants import FEED_FANOUT_LIMIT
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from users.models import Profile
+
+WORDS = (
+    'пост группа автор подписка лента новость день город кот утро вечер '
+    'работа отпуск фото книга музыка кино поезд море горы дождь снег '
+    'python django база запрос индекс кеш страница сервер'
+).split()
+NAMES = ('Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена')
+SURNAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев')
+
+
+def skewed(count, power=3):
+    """Index in range(count), low ones much more likely: popular heads."""
+    return int(count * random.random() ** power)
+
+
+def sentence(words):
+    return ' '.join(random.choices(WORDS, k=words)).capitalize() + '.'
+
+
+@contextmanager
+def explicit_created(*models):
+    """Lets bulk_create keep given created instead of now."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для нагрузочных тестов: пользователи, '
+        'группы, посты с картинками, комментарии и подписки с перекосом '
+        'к популярным авторам. Сигналы не вызываются, счётчики, лента '
+        'и поисковый индекс пересчитываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help=(
+                'Подписок на пользователя в среднем. Лента хранит '
+                'подписки x посты автора строк, растёт быстрее всего.'
+            )
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.1,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days']).total_seconds()
+
+        user_ids = self.create_users(options['users'])
+        group_ids = self.create_groups(options['groups'])
+        images = self.create_images() if options['images'] else []
+        with explicit_created(Post, Comment):
+            self.create_posts(
+                options['posts'], user_ids, group_ids, images,
+                options['images'],
+            )
+            post_ids = list(
+                Post.objects.order_by('-created').values_list('pk', flat=True)
+            )
+            self.create_comments(options['comments'], user_ids, post_ids)
+        self.create_follows(user_ids, options['follows'])
+
+        call_command('reconcile_counters', stdout=self.stdout)
+        self.stdout.write(f'Записей ленты: {self.fill_feed()}.')
+        call_command('rebuild_search_index', stdout=self.stdout)
+        if images:
+            call_command('generate_thumbnails', stdout=self.stdout)
+        cache.clear()
+
+    def random_created(self):
+        return self.now - timedelta(seconds=random.random() * self.span)
+
+    def bulk_create(self, model, objects):
+        # Backend picks the batch size, SQLite caps terms per INSERT.
+        model.objects.bulk_create(list(objects))
+
+    def create_users(self, count):
+        first = User.objects.count()
+        # One hash for all, hashing is the slow part.
+        password = make_password('benchmark')
+        self.bulk_create(User, (
+            User(
+                username=f'user{first + i}',
+                first_name=random.choice(NAMES),
+                last_name=random.choice(SURNAMES),
+                password=password,
+            )
+            for i in range(count)
+        ))
+        user_ids = list(
+            User.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.bulk_create(Profile, (
+            Profile(user_id=pk) for pk in user_ids[first:]
+        ))
+        self.stdout.write(f'Пользователей: {count}.')
+
+        return user_ids
+
+    def create_groups(self, count):
+        first = Group.objects.count()
+        self.bulk_create(Group, (
+            Group(
+                title=f'Группа {first + i}',
+                slug=f'group-{first + i}',
+                description=sentence(10),
+            )
+            for i in range(count)
+        ))
+        self.stdout.write(f'Групп: {count}.')
+
+        return list(Group.objects.values_list('pk', flat=True))
+
+    def create_images(self, count=10):
+        """A few JPEGs shared by posts, thumbnails are per image."""
+        names = []
+        for i in range(count):
+            image = Image.new('RGB', (1200, 800), tuple(
+                random.randrange(256) for _ in range(3)
+            ))
+            content = io.BytesIO()
+            image.save(content, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/seed_{i}.jpg', ContentFile(content.getvalue())
+            ))
+
+        return names
+
+    def create_posts(self, count, user_ids, group_ids, images, image_share):
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            self.bulk_create(Post, [
+                Post(
+                    author_id=user_ids[skewed(len(user_ids))],
+                    group_id=(
+                        group_ids[skewed(len(group_ids), 2)]
+                        if group_ids and random.random() < 0.7 else None
+                    ),
+                    text=sentence(random.randint(5, 60)),
+                    image=(
+                        random.choice(images)
+                        if images and random.random() < image_share else ''
+                    ),
+                    created=self.random_created(),
+                )
+                for _ in range(size)
+            ])
+        self.stdout.write(f'Постов: {count}.')
+
+    def create_comments(self, count, user_ids, post_ids):
+        if not post_ids:
+            return
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            self.bulk_create(Comment, [
+                Comment(
+                    # Recent posts collect most of the comments.
+                    post_id=post_ids[skewed(len(post_ids))],
+                    author_id=random.choice(user_ids),
+                    text=sentence(random.randint(3, 20)),
+                    created=self.random_created(),
+                )
+                for _ in range(size)
+            ])
+        self.stdout.write(f'Комментариев: {count}.')
+
+    def create_follows(self, user_ids, average):
+        """Followed authors are picked with the same skew as post authors."""
+        follows = set(Follow.objects.values_list('user_id', 'author_id'))
+        created = 0
+        for user_id in user_ids:
+            wanted = min(
+                len(user_ids) - 1, int(random.expovariate(1 / average))
+            )
+            authors = set()
+            for _ in range(wanted * 3):
+                if len(authors) >= wanted:
+                    break
+                author_id = user_ids[skewed(len(user_ids))]
+                if author_id == user_id or (user_id, author_id) in follows:
+                    continue
+                authors.add(author_id)
+            self.bulk_create(Follow, [
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in authors
+            ])
+            created += len(authors)
+        self.stdout.write(f'Подписок: {created}.')
+
+    def fill_feed(self):
+        """Materialize feeds of authors below FEED_FANOUT_LIMIT at once."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FeedEntry._meta.db_table}'
+            )
+            cursor.execute(
+                f'INSERT INTO {FeedEntry._meta.db_table} '
+                '(user_id, post_id, created) '
+                'SELECT f.user_id, p.id, p.created '
+                f'FROM {Follow._meta.db_table} f '
+                f'JOIN {Post._meta.db_table} p ON p.author_id = f.author_id '
+                f'JOIN {Profile._meta.db_table} pr '
+                'ON pr.user_id = f.author_id '
+                'WHERE pr.followers_count < %s',
+                [FEED_FANOUT_LIMIT],
+            )
+
+            return cursor.rowcount
@@ -0,0 +1,32 @@
+import logging
+
+from django.conf import settings
+
+from .constants import QUERY_BUDGETS
+from .queries import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Logs posts views going over their query budget or running N+1."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.POSTS_QUERY_BUDGETS:
+            return self.get_response(request)
+
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None and match.view_name in QUERY_BUDGETS:
+            for violation in recorder.get_violations(
+                QUERY_BUDGETS[match.view_name]
+            ):
+                logger.warning(
+                    '%s %s: %s', match.view_name, request.path, violation
+                )
+
+        return response
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# Frozen copy of posts.search, later changes of the backends do not
+# change what this migration creates.
+DOCUMENTS_SQL = '''
+    SELECT p.id, p.text, COALESCE(g.title, ''),
+           TRIM(u.first_name || ' ' || u.last_name || ' ' || u.username)
+    FROM posts_post p
+    JOIN auth_user u ON u.id = p.author_id
+    LEFT JOIN posts_group g ON g.id = p.group_id
+'''
+
+FORWARD = {
+    'sqlite': [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5('
+        'text, group_title, author_name, '
+        "tokenize = 'unicode61 remove_diacritics 2')",
+        'DELETE FROM posts_post_fts',
+        'INSERT INTO posts_post_fts (rowid, text, group_title, author_name) '
+        + DOCUMENTS_SQL,
+    ],
+    'postgresql': [
+        'CREATE TABLE IF NOT EXISTS posts_post_search ('
+        'post_id integer PRIMARY KEY, document tsvector NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS posts_post_search_document '
+        'ON posts_post_search USING GIN (document)',
+        'TRUNCATE posts_post_search',
+        'INSERT INTO posts_post_search (post_id, document) '
+        "SELECT id, setweight(to_tsvector('simple', text), 'A') "
+        "|| setweight(to_tsvector('simple', "
+        "group_title || ' ' || author_name), 'B') "
+        f'FROM ({DOCUMENTS_SQL}) '
+        'AS documents (id, text, group_title, author_name)',
+    ],
+}
+
+BACKWARD = {
+    'sqlite': ['DROP TABLE IF EXISTS posts_post_fts'],
+    'postgresql': ['DROP TABLE IF EXISTS posts_post_search'],
+}
+
+
+def execute(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    execute(schema_editor, FORWARD)
+
+
+def drop_index(apps, schema_editor):
+    execute(schema_editor, BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -17,6 +17,11 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField('описание группы', max_length=500)
+    posts_count = models.PositiveIntegerField(
+        'постов в группе',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         return self.title
@@ -47,11 +52,27 @@ class Post(CreatedModel):
         blank=True,
         null=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'комментариев',
+        default=0,
+        editable=False,
+    )
+    # Versions rendered card, bumped on edit and on author/group changes.
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Default ordering, group and profile pages, admin date filter.
+        # Ascending indexes are read backwards for (-created, -pk) order,
+        # descending ones would need a sort of the pk tie-breaker. SQLite
+        # keeps the rowid in every index, PostgreSQL needs the id column.
+        indexes = [
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['author', 'created', 'id']),
+            models.Index(fields=['group', 'created', 'id']),
+        ]
 
     def __str__(self):
         return self.text[:CUT_STR_POST]
@@ -77,6 +98,10 @@ class Comment(CreatedModel):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['created', 'id']),
+            models.Index(fields=['post', 'created', 'id']),
+        ]
 
 
 class Follow(models.Model):
@@ -103,3 +128,58 @@ class Follow(models.Model):
                 name='unique following'
             )
         ]
+        # Followers of an author, the unique one serves followed authors.
+        indexes = [
+            models.Index(fields=['author', 'user']),
+        ]
+
+
+class FeedEntry(models.Model):
+    """
+    Materialized follow feed. One row per reader and post,
+    written when the post is published or the author is followed.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='пост',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique feed entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created']),
+        ]
+
+
+class Counter(models.Model):
+    """
+    Number of posts in a scope: all posts, group, author or follow feed.
+    Lets list pages skip COUNT(*), recounted once it gets older than TTL.
+    """
+    scope = models.CharField('область', max_length=64, unique=True)
+    value = models.IntegerField('значение', default=0)
+    counted = models.DateTimeField('Дата пересчёта', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Счётчик'
+        verbose_name_plural = 'Счётчики'
+
+    def __str__(self):
+        return f'{self.scope}: {self.value}'
@@ -0,0 +1,181 @@
+"""
+Paginators for post lists.
+
+CountedPaginator takes the number of posts from scope counters,
+EstimatedCountPaginator estimates it for the admin.
+CursorPaginator addresses pages by an opaque cursor holding (created, pk)
+of the boundary post or comment, so a deep page is one index range read
+with no OFFSET and no COUNT(*).
+"""
+import base64
+import collections.abc
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connection
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import counters
+from .constants import ADMIN_COUNT_LIMIT
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class CountedPaginator(Paginator):
+    """Counts objects with scope counters instead of COUNT(*)."""
+
+    def __init__(self, object_list, per_page, scopes=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.scopes = scopes
+
+    @cached_property
+    def count(self):
+        if not self.scopes:
+            return super().count
+
+        return counters.get_count(self.scopes)
+
+
+def estimate_rows(model):
+    """Row count of the table from planner statistics or the pk range."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 or 0 until the table is analyzed.
+        if row and row[0] > 0:
+            return row[0]
+        return None
+
+    # Deleted rows make it an overestimate, one index lookup anyway.
+    return model._default_manager.aggregate(last=Max('pk'))['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin changelist paginator. Unfiltered tables are estimated,
+    filtered ones are counted up to ADMIN_COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_rows(queryset.model)
+            if estimate is not None:
+                return estimate
+
+        return queryset.order_by()[:ADMIN_COUNT_LIMIT].count()
+
+
+def encode_cursor(direction, post):
+    raw = f'{direction}|{post.created.isoformat()}|{post.pk}'
+
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        direction, created, pk = raw.split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        raise InvalidPage('Invalid cursor')
+    if direction not in (NEXT, PREVIOUS) or created is None:
+        raise InvalidPage('Invalid cursor')
+
+    return direction, created, pk
+
+
+class CursorPage(collections.abc.Sequence):
+    """Page of a CursorPaginator. Knows only its neighbours' cursors."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator:
+    """Paginates posts or comments by (created, pk), newest first."""
+    cursor_based = True
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def page(self, cursor=None):
+        posts = self.object_list
+        if not cursor:
+            posts = list(posts.order_by('-created', '-pk')[:self.per_page + 1])
+
+            return CursorPage(
+                posts[:self.per_page],
+                self,
+                has_next=len(posts) > self.per_page,
+                has_previous=False,
+            )
+
+        direction, created, pk = decode_cursor(cursor)
+        if direction == NEXT:
+            posts = list(
+                posts.filter(
+                    Q(created__lt=created) | Q(created=created, pk__lt=pk)
+                ).order_by('-created', '-pk')[:self.per_page + 1]
+            )
+
+            return CursorPage(
+                posts[:self.per_page],
+                self,
+                has_next=len(posts) > self.per_page,
+                has_previous=True,
+            )
+
+        posts = list(
+            posts.filter(
+                Q(created__gt=created) | Q(created=created, pk__gt=pk)
+            ).order_by('created', 'pk')[:self.per_page + 1]
+        )
+
+        return CursorPage(
+            posts[:self.per_page][::-1],
+            self,
+            has_next=True,
+            has_previous=len(posts) > self.per_page,
+        )
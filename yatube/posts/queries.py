@@ -0,0 +1,97 @@
+"""
+Query budgets of posts views.
+
+QueryRecorder collects SQL run inside it on every database, replicas
+included, together with the template line that caused it. A query shape
+(SQL without parameters) repeated N_PLUS_ONE_REPEATS times is reported
+as N+1. QueryBudgetMiddleware logs views going over QUERY_BUDGETS, tests
+assert the same budgets.
+Transaction control is not counted, so tests and autocommit agree:
+atomic blocks run savepoints when nested in a transaction, as in tests,
+and the SQLite backend runs BEGIN for them in autocommit.
+"""
+import sys
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.db import connections
+from django.template.base import Node
+
+from .constants import N_PLUS_ONE_REPEATS
+
+RENDER_CODE = Node.render_annotated.__code__
+TRANSACTION_PREFIXES = (
+    'BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'
+)
+
+
+def get_template_line():
+    """'template:line' of the innermost node being rendered or None."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is RENDER_CODE:
+            node = frame.f_locals['self']
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                return f'{origin.template_name or origin.name}:{token.lineno}'
+        frame = frame.f_back
+
+    return None
+
+
+class QueryRecorder:
+    """Records (sql, template line) of queries run on all connections."""
+
+    def __init__(self):
+        self.queries = []
+        # Databases the queries ran on.
+        self.aliases = set()
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(TRANSACTION_PREFIXES):
+            self.queries.append((sql, get_template_line()))
+            self.aliases.add(context['connection'].alias)
+
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        with ExitStack() as stack:
+            for db in connections.all():
+                stack.enter_context(db.execute_wrapper(self))
+            self._stack = stack.pop_all()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def get_repeated(self):
+        """{sql: template lines} of shapes run N_PLUS_ONE_REPEATS times."""
+        shapes = defaultdict(list)
+        for sql, line in self.queries:
+            shapes[sql].append(line)
+
+        return {
+            sql: lines
+            for sql, lines in shapes.items()
+            if len(lines) >= N_PLUS_ONE_REPEATS
+        }
+
+    def get_violations(self, budget=None):
+        """Messages on N+1 queries and going over the budget."""
+        violations = [
+            f'N+1: {len(lines)} x {sql} at '
+            + ', '.join(sorted({str(line) for line in lines}))
+            for sql, lines in self.get_repeated().items()
+        ]
+        if budget is not None and len(self) > budget:
+            violations.append(
+                f'{len(self)} queries over budget of {budget}'
+            )
+
+        return violations
@@ -0,0 +1,232 @@
+"""
+Full-text search of posts.
+
+A backend keeps its own index of post text, group title and author name.
+Signals update it on every post save and delete and when a group or an
+author is renamed. POSTS_SEARCH_BACKEND picks the backend class, pages of
+results are addressed by opaque cursors, so deep pages cost the same.
+"""
+import base64
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db import connection
+from django.utils.module_loading import import_string
+
+WORD = re.compile(r'\w+')
+
+
+def encode_cursor(rank, pk):
+    return base64.urlsafe_b64encode(f'{rank!r}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        rank, pk = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return float(rank), int(pk)
+    except (ValueError, UnicodeError):
+        raise InvalidPage('Invalid cursor')
+
+
+class SearchBackend(ABC):
+    """Interface of search backends."""
+    # (post id, text, group title, author name) of posts.
+    documents_sql = '''
+        SELECT p.id, p.text, COALESCE(g.title, ''),
+               TRIM(u.first_name || ' ' || u.last_name || ' ' || u.username)
+        FROM posts_post p
+        JOIN auth_user u ON u.id = p.author_id
+        LEFT JOIN posts_group g ON g.id = p.group_id
+    '''
+
+    def install(self):
+        """Create index storage if it does not exist."""
+
+    @abstractmethod
+    def index(self, post_ids):
+        """Add or refresh the posts in the index."""
+
+    @abstractmethod
+    def remove(self, post_ids):
+        """Drop the posts from the index."""
+
+    @abstractmethod
+    def rebuild(self):
+        """Index every post from scratch."""
+
+    @abstractmethod
+    def search(self, query, limit, after=None):
+        """
+        [(rank, post id)] best first, lower rank is better.
+        after is (rank, post id) of the last result of the previous page.
+        """
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """SQLite FTS5 table, rowid is the post id."""
+    table = 'posts_post_fts'
+    # bm25 weights of text, group title and author name.
+    weights = (1.0, 0.5, 0.5)
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+                'text, group_title, author_name, '
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+
+    def index(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        self.remove(post_ids)
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} '
+                '(rowid, text, group_title, author_name) '
+                f'{self.documents_sql} WHERE p.id IN ({placeholders})',
+                post_ids,
+            )
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(post_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})',
+                post_ids,
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} '
+                '(rowid, text, group_title, author_name) '
+                f'{self.documents_sql}'
+            )
+            cursor.execute(
+                f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')"
+            )
+
+    def get_match(self, query):
+        """FTS5 query of the words, user input is never parsed as syntax."""
+        words = WORD.findall(query)
+
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, query, limit, after=None):
+        match = self.get_match(query)
+        if not match:
+            return []
+        weights = ', '.join(map(str, self.weights))
+        sql = (
+            f'SELECT bm25({self.table}, {weights}) AS score, rowid '
+            f'FROM {self.table} WHERE {self.table} MATCH %s'
+        )
+        params = [match]
+        if after is not None:
+            sql = (
+                f'SELECT score, rowid FROM ({sql}) '
+                'WHERE score > %s OR (score = %s AND rowid < %s)'
+            )
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, rowid DESC LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+
+            return cursor.fetchall()
+
+
+class PostgresFTSBackend(SearchBackend):
+    """tsvector table with a GIN index, text weighs more than the rest."""
+    table = 'posts_post_search'
+    config = 'simple'
+
+    @property
+    def document_sql(self):
+        return (
+            f"SELECT id, setweight(to_tsvector('{self.config}', text), 'A')"
+            f" || setweight(to_tsvector('{self.config}', "
+            "group_title || ' ' || author_name), 'B') "
+            f'FROM ({self.documents_sql}) '
+            'AS documents (id, text, group_title, author_name)'
+        )
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                'post_id integer PRIMARY KEY, document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.table}_document '
+                f'ON {self.table} USING GIN (document)'
+            )
+
+    def index(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (post_id, document) '
+                f'{self.document_sql} WHERE id = ANY(%s) '
+                'ON CONFLICT (post_id) DO UPDATE '
+                'SET document = EXCLUDED.document',
+                [post_ids],
+            )
+
+    def remove(self, post_ids):
+        post_ids = list(post_ids)
+        if not post_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE post_id = ANY(%s)',
+                [post_ids],
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (post_id, document) '
+                f'{self.document_sql}'
+            )
+
+    def search(self, query, limit, after=None):
+        words = WORD.findall(query)
+        if not words:
+            return []
+        # Words only, so the query has no tsquery syntax of its own.
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        sql = (
+            'SELECT -ts_rank(document, query) AS score, post_id '
+            f'FROM {self.table}, to_tsquery(%s, %s) AS query '
+            'WHERE document @@ query'
+        )
+        params = [self.config, tsquery]
+        if after is not None:
+            sql = (
+                f'SELECT score, post_id FROM ({sql}) AS ranked '
+                'WHERE score > %s OR (score = %s AND post_id < %s)'
+            )
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY score, post_id DESC LIMIT %s'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+
+            return cursor.fetchall()
+
+
+def get_backend():
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
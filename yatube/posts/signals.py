@@ -0,0 +1,240 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Profile
+from . import cache as page_cache
+from . import authors, counters, feed, follows, search, thumbnails
+from .models import Comment, FeedEntry, Follow, Group, Post, User
+
+# User fields rendered on post cards.
+CARD_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def touch_posts(posts):
+    """Bump posts version so their cached cards are rendered again."""
+    posts.update(updated=timezone.now())
+
+
+def bump_post_pages(post, *group_ids):
+    """New generation of the list pages the post is shown on."""
+    usernames = User.objects.filter(
+        pk=post.author_id
+    ).values_list('username', flat=True)
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk]
+    ).values_list('slug', flat=True)
+    page_cache.bump([
+        'posts',
+        *map(page_cache.author_scope, usernames),
+        *map(page_cache.group_scope, slugs),
+    ])
+
+
+def refresh_posts(**lookups):
+    """Render again cards and pages of the posts."""
+    posts = Post.objects.filter(**lookups)
+    touch_posts(posts)
+    for post in posts.only('author_id', 'group_id'):
+        bump_post_pages(post, post.group_id)
+
+
+def shift_post_counters(post, delta):
+    counters.change(counters.post_scopes(post), delta)
+    counters.shift(
+        Profile.objects.filter(user_id=post.author_id), 'posts_count', delta
+    )
+    authors.forget([post.author_id])
+    if post.group_id:
+        counters.shift(
+            Group.objects.filter(pk=post.group_id), 'posts_count', delta
+        )
+
+
+def move_post_between_groups(old_group_id, new_group_id):
+    for group_id, delta in ((old_group_id, -1), (new_group_id, 1)):
+        if group_id:
+            counters.change([counters.group_scope(group_id)], delta)
+            counters.shift(
+                Group.objects.filter(pk=group_id), 'posts_count', delta
+            )
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, **kwargs):
+    # Counter columns are owned by signals, do not overwrite them.
+    if instance.pk is not None:
+        saved = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('posts_count', 'title').first()
+        if saved:
+            instance.posts_count, instance._saved_title = saved
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, created, **kwargs):
+    if not created:
+        touch_posts(instance.posts.all())
+        page_cache.bump(['site'])
+        if getattr(instance, '_saved_title', None) != instance.title:
+            search.get_backend().index(
+                instance.posts.values_list('pk', flat=True)
+            )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    touch_posts(instance.posts.all())
+    page_cache.bump(['site'])
+    instance._post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    search.get_backend().index(getattr(instance, '_post_ids', ()))
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    if update_fields and not set(update_fields) & set(CARD_USER_FIELDS):
+        return
+    saved = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*CARD_USER_FIELDS).first()
+    current = tuple(getattr(instance, field) for field in CARD_USER_FIELDS)
+    instance._card_changed = saved is not None and saved != current
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    authors.forget([instance.pk])
+    if getattr(instance, '_card_changed', False):
+        touch_posts(instance.posts.all())
+        page_cache.bump(['site'])
+        search.get_backend().index(
+            instance.posts.values_list('pk', flat=True)
+        )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    authors.forget([instance.pk])
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    # Remember the group to move the post between group counters
+    # and the image to know if it needs a new thumbnail,
+    # counter columns are owned by signals, do not overwrite them.
+    if instance.pk is not None:
+        saved = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image', 'comments_count').first()
+        if saved:
+            (
+                instance._saved_group_id,
+                instance._saved_image,
+                instance.comments_count,
+            ) = saved
+
+
+def schedule_thumbnail(post):
+    image = str(post.image or '')
+    if image and image != getattr(post, '_saved_image', None):
+        transaction.on_commit(lambda: thumbnails.schedule(image))
+
+
+@receiver(post_save, sender=Post)
+def post_published(sender, instance, created, **kwargs):
+    schedule_thumbnail(instance)
+    search.get_backend().index([instance.pk])
+    if created:
+        shift_post_counters(instance, 1)
+        feed.fan_out(instance)
+        bump_post_pages(instance, instance.group_id)
+        return
+
+    old_group_id = getattr(instance, '_saved_group_id', None)
+    if old_group_id != instance.group_id:
+        move_post_between_groups(old_group_id, instance.group_id)
+    bump_post_pages(instance, old_group_id, instance.group_id)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Feed entries are cascaded without signals, count them down here.
+    readers = FeedEntry.objects.filter(
+        post=instance
+    ).values_list('user_id', flat=True)
+    counters.change([counters.feed_scope(pk) for pk in readers], -1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    shift_post_counters(instance, -1)
+    search.get_backend().remove([instance.pk])
+    bump_post_pages(instance, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(
+            Post.objects.filter(pk=instance.post_id), 'comments_count', 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.shift(
+        Post.objects.filter(pk=instance.post_id), 'comments_count', -1
+    )
+
+
+def bump_followed_profile(follow):
+    # Followers count of the author, following count of the follower.
+    usernames = User.objects.filter(
+        pk__in=[follow.author_id, follow.user_id]
+    ).values_list('username', flat=True)
+    page_cache.bump([
+        *map(page_cache.author_scope, usernames),
+        page_cache.feed_scope(follow.user_id),
+    ])
+
+
+def shift_follow_counters(follow, delta):
+    counters.shift(
+        Profile.objects.filter(user_id=follow.author_id),
+        'followers_count',
+        delta,
+    )
+    counters.shift(
+        Profile.objects.filter(user_id=follow.user_id),
+        'following_count',
+        delta,
+    )
+    authors.forget([follow.author_id, follow.user_id])
+    follows.forget([follow.user_id])
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        shift_follow_counters(instance, 1)
+        feed.backfill(instance.user_id, instance.author_id)
+        bump_followed_profile(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    shift_follow_counters(instance, -1)
+    feed.prune(instance.user_id, instance.author_id)
+    bump_followed_profile(instance)
@@ -0,0 +1,17 @@
+from django import template
+
+from posts.thumbnails import get_ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """
+    Generated thumbnail of the post image or None while it is pending.
+    List views attach post.thumbnails to look the whole page up at once.
+    """
+    if hasattr(post, 'thumbnails'):
+        return post.thumbnails.get(post.image)
+
+    return get_ready_thumbnail(post.image)
@@ -1,7 +1,24 @@
+from django.core.cache import cache
 from django.test import TestCase, Client
 from django.urls import reverse
 
+from posts.constants import QUERY_BUDGETS
 from posts.models import Post, Group, User
+from posts.queries import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """assertWithinBudget() for posts views tests."""
+
+    def assertWithinBudget(self, client, address):
+        """Response of the view, fails on going over budget or N+1."""
+        with QueryRecorder() as recorder:
+            response = client.get(address)
+        view_name = response.resolver_match.view_name
+        violations = recorder.get_violations(QUERY_BUDGETS[view_name])
+        self.assertEqual(violations, [], f'{view_name} {address}')
+
+        return response
 
 
 class TestBase(TestCase):
@@ -21,6 +38,10 @@ class TestBase(TestCase):
             group=cls.group,
         )
 
+    def setUp(self):
+        # Rolled back rows do not fire signals, cached state would leak.
+        cache.clear()
+
 
 class TestBaseWithClients(TestBase):
     @classmethod
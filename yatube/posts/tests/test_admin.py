@@ -0,0 +1,67 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, User
+from .fixtures import TestBase
+
+
+class AdminTests(TestBase):
+    """Changelists do not scan or count whole tables."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@yatube.ru', password='admin'
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.non_author, text='comment'
+        )
+        Follow.objects.create(author=cls.author, user=cls.non_author)
+        Post.objects.create(text='найди меня', author=cls.non_author)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelists_skip_count(self):
+        for model in ('post', 'comment', 'follow'):
+            address = reverse(f'admin:posts_{model}_changelist')
+            with self.subTest(model=model):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(address)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(*)', query['sql'].upper())
+
+    def test_no_group_select_per_row(self):
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertNotContains(response, '<select name="form-0-group"')
+
+    def test_post_search_uses_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'найди'}
+            )
+        self.assertEqual(
+            [post.text for post in response.context['cl'].result_list],
+            ['найди меня']
+        )
+        for query in queries.captured_queries:
+            self.assertNotIn('LIKE', query['sql'].upper())
+
+    def test_post_search_keeps_rank(self):
+        """Results follow the backend ranking, not the model ordering."""
+        ranked = list(Post.objects.order_by('pk').values_list('pk', flat=True))
+        with mock.patch('posts.admin.get_backend') as get_backend:
+            get_backend.return_value.search.return_value = [
+                (rank, pk) for rank, pk in enumerate(ranked)
+            ]
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'запись'}
+            )
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list], ranked
+        )
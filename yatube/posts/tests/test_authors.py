@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.http import Http404
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from posts import cache as page_cache
+from posts.authors import get_author, get_authors, record_key
+from posts.follows import follow_set_key
+from posts.models import Follow, Post, User
+from .fixtures import TestBaseWithClients
+
+
+class AuthorCacheTests(TestBaseWithClients):
+    """Author records are cached and forgotten on change."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_record_is_cached(self):
+        author = get_author(self.author.username)
+        self.assertEqual(author.pk, self.author.pk)
+        self.assertEqual(author.posts_count, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_author(self.author.username), author)
+            self.assertEqual(get_authors([self.author.pk]), {
+                self.author.pk: author
+            })
+
+    def test_as_user(self):
+        with self.assertNumQueries(1):
+            user = get_author(self.author.username).as_user()
+            self.assertEqual(user, self.author)
+            self.assertEqual(user.username, self.author.username)
+            self.assertEqual(user.profile.posts_count, 1)
+
+    def test_unknown_username(self):
+        with self.assertRaises(Http404):
+            get_author('nobody')
+
+    def test_forgotten_on_user_save(self):
+        get_author(self.author.username)
+        self.author.first_name = 'Лев'
+        self.author.last_name = 'Толстой'
+        self.author.save()
+        self.assertEqual(
+            get_author(self.author.username).get_full_name(), 'Лев Толстой'
+        )
+
+    def test_renamed_user(self):
+        old_username = self.non_author.username
+        get_author(old_username)
+        self.non_author.username = 'renamed'
+        self.non_author.save()
+        with self.assertRaises(Http404):
+            get_author(old_username)
+        self.assertEqual(get_author('renamed').pk, self.non_author.pk)
+
+    def test_counters_follow_changes(self):
+        get_authors([self.author.pk, self.non_author.pk])
+        Post.objects.create(author=self.author, text='new')
+        Follow.objects.create(author=self.author, user=self.non_author)
+        author = get_author(self.author.username)
+        self.assertEqual(author.posts_count, 2)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(
+            get_author(self.non_author.username).following_count, 1
+        )
+
+    def test_follow_views_use_record(self):
+        get_author(self.author.username)
+        follow = reverse('posts:profile_follow', kwargs=self.ARG_PROFILE)
+        unfollow = reverse('posts:profile_unfollow', kwargs=self.ARG_PROFILE)
+        self.non_author_client.get(follow)
+        self.assertTrue(Follow.objects.filter(
+            author=self.author, user=self.non_author
+        ).exists())
+        self.author_client.get(follow)
+        self.assertFalse(Follow.objects.filter(user=self.author).exists())
+        self.non_author_client.get(unfollow)
+        self.assertFalse(Follow.objects.exists())
+
+
+class ForgetOnCommitTests(TransactionTestCase):
+    """Rows cached by other requests before the commit are dropped."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+
+    def cache_old_rows(self):
+        """What a concurrent request caches from the committed rows."""
+        cache.set_many({
+            record_key(self.author.pk): 'stale',
+            record_key(self.reader.pk): 'stale',
+            follow_set_key(self.reader.pk): 'stale',
+            'generation:author:author': 0,
+        })
+
+    def test_follow(self):
+        with transaction.atomic():
+            Follow.objects.create(author=self.author, user=self.reader)
+            self.cache_old_rows()
+        self.assertEqual(get_author('author').followers_count, 1)
+        self.assertEqual(get_author('reader').following_count, 1)
+        self.assertIsNone(cache.get(follow_set_key(self.reader.pk)))
+        self.assertNotEqual(
+            page_cache.get_generations(['author:author']), [0]
+        )
+
+    def test_rollback(self):
+        with transaction.atomic():
+            Follow.objects.create(author=self.author, user=self.reader)
+            transaction.set_rollback(True)
+        self.assertEqual(get_author('author').followers_count, 0)
+
+    def test_reconcile_counters(self):
+        # The report is written after forget(), before the commit.
+        output = SimpleNamespace(write=lambda text: self.cache_old_rows())
+        call_command('reconcile_counters', stdout=output)
+        self.assertIsNone(cache.get(record_key(self.author.pk)))
+        self.assertEqual(get_author('author').followers_count, 0)
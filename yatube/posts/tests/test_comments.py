@@ -0,0 +1,42 @@
+from django.urls import reverse
+
+from posts.constants import COMMENTS_PAGE
+from posts.models import Comment
+from .fixtures import TestBaseWithClients
+
+
+class CommentPaginationTests(TestBaseWithClients):
+    """Post detail shows a page of comments, the rest is loaded by cursor."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.non_author, text=f'comment {i}')
+            for i in range(COMMENTS_PAGE + 5)
+        )
+        cls.ADDRESS_COMMENTS = reverse('posts:comments', kwargs=cls.ARG_DETAIL)
+
+    def test_initial_render_is_capped(self):
+        """На странице поста не больше COMMENTS_PAGE комментариев."""
+        comments = self.client.get(self.ADDRESS_DETAIL).context['comments']
+        self.assertEqual(len(comments), COMMENTS_PAGE)
+        self.assertTrue(comments.has_next())
+
+    def test_load_more(self):
+        """Фрагмент по курсору отдаёт оставшиеся комментарии без повторов."""
+        first = self.client.get(self.ADDRESS_DETAIL).context['comments']
+        response = self.client.get(
+            self.ADDRESS_COMMENTS, {'cursor': first.next_cursor}
+        )
+        rest = response.context['comments']
+        self.assertEqual(len(rest), 5)
+        self.assertFalse(rest.has_next())
+        self.assertEqual(
+            {comment.pk for comment in [*first, *rest]},
+            set(self.post.comments.values_list('pk', flat=True)),
+        )
+        self.assertTemplateNotUsed(response, 'base.html')
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.ADDRESS_COMMENTS, {'cursor': 'x'})
+        self.assertEqual(response.status_code, 404)
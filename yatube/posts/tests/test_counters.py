@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.core.management import call_command
+
+from posts.models import Comment, Follow, Group, Post
+from users.models import Profile
+from .fixtures import TestBase
+
+
+class CounterColumnsTests(TestBase):
+    """Denormalized counters on Group, Post and Profile."""
+
+    def assertCounters(self, posts, comments, followers):
+        self.group.refresh_from_db()
+        self.post.refresh_from_db()
+        author = Profile.objects.get(user=self.author)
+        follower = Profile.objects.get(user=self.non_author)
+        self.assertEqual(self.group.posts_count, posts)
+        self.assertEqual(author.posts_count, posts)
+        self.assertEqual(self.post.comments_count, comments)
+        self.assertEqual(author.followers_count, followers)
+        self.assertEqual(follower.following_count, followers)
+
+    def test_counters_follow_changes(self):
+        """Save and delete paths keep counters consistent."""
+        self.assertCounters(posts=1, comments=0, followers=0)
+        new_post = Post.objects.create(
+            text='one more', author=self.author, group=self.group
+        )
+        comment = Comment.objects.create(
+            text='first', post=self.post, author=self.non_author
+        )
+        follow = Follow.objects.create(
+            author=self.author,
+            user=self.non_author
+        )
+        self.assertCounters(posts=2, comments=1, followers=1)
+
+        new_post.delete()
+        comment.delete()
+        follow.delete()
+        self.assertCounters(posts=1, comments=0, followers=0)
+
+    def test_post_edit_keeps_comments_count(self):
+        """Saving stale instance does not overwrite counter column."""
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            text='first', post=self.post, author=self.non_author
+        )
+        other_group = Group.objects.create(title='other', slug='other')
+        stale.group = other_group
+        stale.save()
+        self.post.refresh_from_db()
+        self.group.refresh_from_db()
+        other_group.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(other_group.posts_count, 1)
+
+    def test_reconcile_command(self):
+        """Command recomputes drifted counters."""
+        Group.objects.update(posts_count=42)
+        Post.objects.update(comments_count=42)
+        Profile.objects.filter(user=self.non_author).delete()
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(posts=1, comments=0, followers=0)
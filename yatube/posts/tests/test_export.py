@@ -0,0 +1,159 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.constants import TEMP_MEDIA_ROOT
+from posts.export import Export, stream
+from posts.models import Comment, Post
+from .fixtures import TestBaseWithClients
+from .utils import create_image
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ExportTests(TestBaseWithClients):
+    """Posts and comments are streamed out as NDJSON, CSV or zip."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.image_post = Post.objects.create(
+            author=cls.author, text='с картинкой', image=create_image()
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.non_author, text='комментарий'
+        )
+        cls.ADDRESS_EXPORT = reverse('posts:export')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get_rows(self, **kwargs):
+        text = ''.join(stream(Export(**kwargs), 'ndjson'))
+
+        return [json.loads(line) for line in text.splitlines()]
+
+    def test_user_export(self):
+        rows = self.get_rows(user=self.author)
+        self.assertEqual(
+            [(row['type'], row['id']) for row in rows],
+            [('post', self.post.pk), ('post', self.image_post.pk)],
+        )
+        self.assertEqual(rows[0]['text'], self.post.text)
+        self.assertEqual(rows[0]['group'], self.group.slug)
+        self.assertEqual(rows[1]['image'], self.image_post.image.name)
+        rows = self.get_rows(user=self.non_author)
+        self.assertEqual(rows, [{
+            'type': 'comment',
+            'id': self.comment.pk,
+            'post': self.post.pk,
+            'author': self.non_author.username,
+            'group': None,
+            'text': self.comment.text,
+            'created': self.comment.created.isoformat(),
+            'image': None,
+        }])
+
+    def test_group_export(self):
+        rows = self.get_rows(group=self.group)
+        self.assertEqual(
+            [(row['type'], row['id']) for row in rows],
+            [('post', self.post.pk), ('comment', self.comment.pk)],
+        )
+
+    def test_keyset_pages_without_server_side_cursors(self):
+        """With pgbouncer no query reads more than EXPORT_CHUNK_SIZE rows."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'tie {i}') for i in range(3)
+        )
+        Post.objects.create(
+            author=self.author, text='image', image=create_image()
+        )
+        Post.objects.filter(author=self.author).update(
+            created=self.post.created
+        )
+        export = Export(user=self.author)
+        rows = self.get_rows(user=self.author)
+        images = list(export.images())
+        with mock.patch(
+            'posts.export.streams_rows', return_value=False
+        ), mock.patch('posts.export.EXPORT_CHUNK_SIZE', 2):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.get_rows(user=self.author), rows)
+                self.assertEqual(list(export.images()), images)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(images), 2)
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+        ]
+        # 6 posts in 4 pages, 2 images in 2 pages.
+        self.assertEqual(len(selects), 6)
+        for sql in selects:
+            self.assertIn('LIMIT 2', sql)
+
+    def test_view_streams_csv(self):
+        response = self.author_client.get(self.ADDRESS_EXPORT, {
+            'format': 'csv'
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [str(self.post.pk), str(self.image_post.pk)],
+        )
+
+    def test_view_zip_with_images(self):
+        response = self.author_client.get(self.ADDRESS_EXPORT, {
+            'images': 1
+        })
+        archive = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content))
+        )
+        image = f'images/{self.image_post.image.name}'
+        self.assertEqual(archive.namelist(), ['export.ndjson', image])
+        with self.image_post.image.open() as file:
+            self.assertEqual(archive.read(image), file.read())
+        self.assertEqual(
+            len(archive.read('export.ndjson').decode().splitlines()), 2
+        )
+
+    def test_view_access(self):
+        response = self.client.get(self.ADDRESS_EXPORT)
+        self.assertEqual(response.status_code, 302)
+        response = self.author_client.get(self.ADDRESS_EXPORT, {
+            'group': self.group.slug
+        })
+        self.assertEqual(response.status_code, 403)
+        response = self.author_client.get(self.ADDRESS_EXPORT, {
+            'format': 'xml'
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command(
+            'export_posts', '--group', self.group.slug, stdout=output
+        )
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.zip')
+            call_command(
+                'export_posts', '--user', self.author.username,
+                '--format', 'csv', '--images', '--output', path,
+            )
+            names = zipfile.ZipFile(path).namelist()
+        self.assertIn('export.csv', names)
@@ -0,0 +1,80 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from posts.models import FeedEntry, Follow, Post, User
+from users.models import Profile
+from .fixtures import TestBaseWithClients
+
+
+class FeedTests(TestBaseWithClients):
+    """Materialized follow feed."""
+
+    def get_feed_posts(self):
+        response = self.non_author_client.get(self.ADDRESS_PROFOLLOW)
+
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_feed(self):
+        """Following author copies his old posts into the feed."""
+        Follow.objects.create(author=self.author, user=self.non_author)
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=self.non_author,
+                post=self.post
+            ).exists()
+        )
+        self.assertEqual(self.get_feed_posts(), [self.post])
+
+    def test_new_post_fanned_out(self):
+        """New post is written into feeds of all followers."""
+        Follow.objects.create(author=self.author, user=self.non_author)
+        new_post = Post.objects.create(text='fan me out', author=self.author)
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                user=self.non_author,
+                post=new_post
+            ).exists()
+        )
+        self.assertEqual(self.get_feed_posts(), [new_post, self.post])
+
+    def test_unfollow_prunes_feed(self):
+        """Unfollowing author removes his posts from the feed."""
+        Follow.objects.create(author=self.author, user=self.non_author)
+        Follow.objects.filter(
+            author=self.author,
+            user=self.non_author
+        ).delete()
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.non_author).exists()
+        )
+        self.assertEqual(self.get_feed_posts(), [])
+
+    @mock.patch('posts.feed.FEED_FANOUT_LIMIT', 1)
+    def test_heavy_author_merged_on_read(self):
+        """Heavy author is not fanned out but still shows up in the feed."""
+        Follow.objects.create(author=self.author, user=self.non_author)
+        new_post = Post.objects.create(text='too popular', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.get_feed_posts(), [new_post, self.post])
+
+    @mock.patch('posts.feed.FEED_FANOUT_LIMIT', 2)
+    def test_author_stops_being_heavy(self):
+        """
+        Posts written while author was heavy are merged on read until
+        backfill_feeds writes them, the unfollow itself writes nothing.
+        """
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(author=self.author, user=self.non_author)
+        Follow.objects.create(author=self.author, user=reader)
+        new_post = Post.objects.create(text='heavy times', author=self.author)
+        Follow.objects.filter(author=self.author, user=reader).delete()
+        entry = FeedEntry.objects.filter(user=self.non_author, post=new_post)
+        self.assertFalse(entry.exists())
+        self.assertTrue(Profile.objects.get(user=self.author).feed_backfill)
+        self.assertEqual(self.get_feed_posts(), [new_post, self.post])
+        call_command('backfill_feeds', stdout=StringIO())
+        self.assertTrue(entry.exists())
+        self.assertFalse(Profile.objects.get(user=self.author).feed_backfill)
+        self.assertEqual(self.get_feed_posts(), [new_post, self.post])
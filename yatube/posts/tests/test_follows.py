@@ -0,0 +1,59 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from posts.follows import FollowSet, get_follow_set
+from posts.models import Follow, User
+from .fixtures import TestBaseWithClients
+
+
+class FollowSetTests(TestBaseWithClients):
+    """Followed authors are read once per request and cached per user."""
+
+    def test_one_query_for_any_number_of_checks(self):
+        Follow.objects.create(author=self.author, user=self.non_author)
+        follow_set = FollowSet(self.non_author)
+        with self.assertNumQueries(1):
+            self.assertIn(self.author.pk, follow_set)
+            self.assertNotIn(self.non_author.pk, follow_set)
+            self.assertEqual(len(follow_set), 1)
+        with self.assertNumQueries(0):
+            self.assertIn(self.author.pk, FollowSet(self.non_author))
+
+    @override_settings(POSTS_FOLLOW_SET_CACHE=False)
+    def test_without_cache(self):
+        FollowSet(self.non_author).ids
+        with self.assertNumQueries(1):
+            self.assertNotIn(self.author.pk, FollowSet(self.non_author))
+
+    def test_anonymous(self):
+        with self.assertNumQueries(0):
+            self.assertNotIn(self.author.pk, FollowSet(AnonymousUser()))
+
+    def test_forgotten_on_follow_changes(self):
+        self.assertNotIn(self.author.pk, FollowSet(self.non_author))
+        follow = Follow.objects.create(
+            author=self.author, user=self.non_author
+        )
+        self.assertIn(self.author.pk, FollowSet(self.non_author))
+        follow.delete()
+        self.assertNotIn(self.author.pk, FollowSet(self.non_author))
+
+    def test_shared_by_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.non_author
+        self.assertIs(get_follow_set(request), get_follow_set(request))
+
+    def test_card_follow_links(self):
+        writer = User.objects.create_user(username='writer')
+        self.post.author = writer
+        self.post.save()
+        Follow.objects.create(author=writer, user=self.non_author)
+        unfollow = reverse('posts:profile_unfollow', args=[writer.username])
+        follow = reverse('posts:profile_follow', args=[writer.username])
+        response = self.non_author_client.get(self.ADDRESS_INDEX)
+        self.assertContains(response, unfollow)
+        self.assertNotContains(response, follow)
+        response = self.author_client.get(self.ADDRESS_INDEX)
+        self.assertContains(response, follow)
+        self.assertNotContains(self.client.get(self.ADDRESS_INDEX), follow)
@@ -0,0 +1,65 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow
+from .fixtures import TestBaseWithClients
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite query plans')
+class QueryPlanTests(TestBaseWithClients):
+    """Main queries of the views read an index in order, never sort."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Comment.objects.create(
+            post=cls.post, author=cls.non_author, text='comment'
+        )
+        Follow.objects.create(author=cls.author, user=cls.non_author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def assertIndexedOrder(self, tables):
+        for address, table in tables.items():
+            with CaptureQueriesContext(connection) as queries:
+                self.non_author_client.get(address)
+            ordered = [
+                query['sql'] for query in queries.captured_queries
+                if query['sql'].startswith('SELECT')
+                and f'FROM "{table}"' in query['sql']
+                and 'ORDER BY' in query['sql']
+            ]
+            with self.subTest(address=address):
+                self.assertTrue(ordered)
+                for sql in ordered:
+                    plan = self.get_plan(sql)
+                    self.assertIn('INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_ordered_queries_use_indexes(self):
+        self.assertIndexedOrder({
+            self.ADDRESS_INDEX: 'posts_post',
+            self.ADDRESS_GROUP: 'posts_post',
+            self.ADDRESS_PROFILE: 'posts_post',
+            self.ADDRESS_PROFOLLOW: 'posts_post',
+            self.ADDRESS_DETAIL: 'posts_comment',
+        })
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_cursor_pages_use_indexes(self):
+        """(-created, -pk) order is served by the same indexes."""
+        self.assertIndexedOrder({
+            self.ADDRESS_INDEX: 'posts_post',
+            self.ADDRESS_GROUP: 'posts_post',
+            self.ADDRESS_PROFILE: 'posts_post',
+        })
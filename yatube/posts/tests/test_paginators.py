@@ -0,0 +1,149 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import counters
+from posts.constants import PAGES, MULTIPLIER_FOR_EVERYTHING
+from posts.models import Counter, Group, Post, Follow
+from .fixtures import TestBaseWithClients
+
+
+@override_settings(POSTS_CURSOR_PAGINATION=True)
+class CursorPaginationTests(TestBaseWithClients):
+    """Keyset pagination mode of post lists."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.bulk_create(
+            Post(text=f'post {i}', author=cls.author, group=cls.group)
+            for i in range(MULTIPLIER_FOR_EVERYTHING * 2)
+        )
+        Follow.objects.create(author=cls.author, user=cls.non_author)
+        cls.paginated = {
+            cls.ADDRESS_INDEX: Post.objects.all(),
+            cls.ADDRESS_GROUP: cls.group.posts.all(),
+            cls.ADDRESS_PROFILE: cls.author.posts.all(),
+            cls.ADDRESS_PROFOLLOW: cls.author.posts.all(),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, address):
+        """Follow next cursors to the end, collect pages."""
+        pages = []
+        response = self.non_author_client.get(address)
+        while True:
+            page = response.context['page_obj']
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            response = self.non_author_client.get(
+                address, {'cursor': page.next_cursor}
+            )
+
+    def test_cursor_pages_cover_queryset(self):
+        """Pages go newest first, each post exactly once."""
+        for address, posts in self.paginated.items():
+            with self.subTest(address=address):
+                pages = self.walk(address)
+                expected = list(posts.order_by('-created', '-pk'))
+                self.assertEqual(
+                    [post for page in pages for post in page],
+                    expected
+                )
+                self.assertTrue(all(len(page) <= PAGES for page in pages))
+
+    def test_previous_cursor(self):
+        """Previous cursor returns the page we came from."""
+        first, second = self.walk(self.ADDRESS_INDEX)[:2]
+        response = self.non_author_client.get(
+            self.ADDRESS_INDEX, {'cursor': second.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), list(first))
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_no_count_query(self):
+        """Cursor pages never count the table."""
+        page = self.walk(self.ADDRESS_INDEX)[0]
+        with CaptureQueriesContext(connection) as queries:
+            self.non_author_client.get(
+                self.ADDRESS_INDEX, {'cursor': page.next_cursor}
+            )
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_invalid_cursor(self):
+        """Broken cursor is 404, not 500."""
+        response = self.non_author_client.get(
+            self.ADDRESS_INDEX, {'cursor': 'chupakabra'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class CountedPaginatorTests(TestBaseWithClients):
+    """Post counts of list pages come from scope counters."""
+
+    def setUp(self):
+        cache.clear()
+
+    def get_count(self, scope):
+        return counters.get_count([scope])
+
+    def test_lists_do_not_count_posts(self):
+        """Once counters exist list pages issue no COUNT(*)."""
+        Follow.objects.create(author=self.author, user=self.non_author)
+        addresses = (
+            self.ADDRESS_INDEX,
+            self.ADDRESS_GROUP,
+            self.ADDRESS_PROFILE,
+            self.ADDRESS_PROFOLLOW,
+        )
+        for address in addresses:
+            self.non_author_client.get(address)
+            with self.subTest(address=address):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.non_author_client.get(address)
+                self.assertEqual(response.context['paginator'].count, 1)
+                for query in queries.captured_queries:
+                    self.assertNotIn('COUNT(*)', query['sql'].upper())
+
+    def test_counters_follow_posts(self):
+        """Create, move between groups and delete keep counters exact."""
+        Follow.objects.create(author=self.author, user=self.non_author)
+        other_group = Group.objects.create(title='other', slug='other')
+        group = counters.group_scope(self.group.pk)
+        other = counters.group_scope(other_group.pk)
+        author = counters.author_scope(self.author.pk)
+        feed = counters.feed_scope(self.non_author.pk)
+        for scope in ('posts', group, other, author, feed):
+            self.get_count(scope)
+
+        new_post = Post.objects.create(
+            text='count me', author=self.author, group=self.group
+        )
+        new_post.group = other_group
+        new_post.save()
+        expected = {'posts': 2, group: 1, other: 1, author: 2, feed: 2}
+        for scope, value in expected.items():
+            with self.subTest(scope=scope):
+                self.assertEqual(self.get_count(scope), value)
+
+        new_post.delete()
+        expected = {'posts': 1, group: 1, other: 0, author: 1, feed: 1}
+        for scope, value in expected.items():
+            with self.subTest(scope=scope, deleted=True):
+                self.assertEqual(self.get_count(scope), value)
+
+    def test_stale_counter_recounted(self):
+        """Counter older than TTL is recounted from the table."""
+        Counter.objects.create(scope='posts', value=100)
+        self.assertEqual(self.get_count('posts'), 100)
+        Counter.objects.update(
+            counted=Counter.objects.get().counted - timedelta(days=1)
+        )
+        self.assertEqual(self.get_count('posts'), 1)
@@ -0,0 +1,90 @@
+import shutil
+from unittest import mock
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.constants import PAGES, QUERY_BUDGETS, TEMP_MEDIA_ROOT
+from posts.models import Comment, Follow, Group, Post, User
+from posts.queries import QueryRecorder
+from .fixtures import QueryBudgetMixin, TestBaseWithClients
+from .utils import create_image
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(QueryBudgetMixin, TestBaseWithClients):
+    """Posts views stay within budget and run no N+1 queries."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        authors = [cls.author] + [
+            User.objects.create_user(username=f'writer{i}') for i in range(3)
+        ]
+        groups = [cls.group] + [
+            Group.objects.create(title=f'group {i}', slug=f'group-{i}')
+            for i in range(3)
+        ]
+        # Every other post has an image, half of them with thumbnails,
+        # so pages look both ready and pending thumbnails up.
+        for i in range(PAGES * 2):
+            post = Post.objects.create(
+                text=f'post {i}',
+                author=authors[i % len(authors)],
+                group=groups[i % len(groups)],
+                image=create_image() if i % 2 else None,
+            )
+            if i % 4 == 1:
+                thumbnails.generate(post.image.name)
+        for author in authors:
+            Follow.objects.create(author=author, user=cls.non_author)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text='comment')
+            for author in authors * 2
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_views_within_budget(self):
+        """Cold caches and counters included."""
+        addresses = {
+            self.ADDRESS_INDEX: (self.client, self.non_author_client),
+            self.ADDRESS_GROUP: (self.client, self.non_author_client),
+            self.ADDRESS_PROFILE: (self.client, self.non_author_client),
+            self.ADDRESS_DETAIL: (self.client, self.non_author_client),
+            reverse('posts:comments', kwargs=self.ARG_DETAIL): (
+                self.client, self.non_author_client
+            ),
+            self.ADDRESS_PROFOLLOW: (self.non_author_client,),
+            reverse('posts:search') + '?q=post': (
+                self.client, self.non_author_client
+            ),
+        }
+        for address, clients in addresses.items():
+            for client in clients:
+                with self.subTest(address=address, client=client):
+                    cache.clear()
+                    self.assertWithinBudget(client, address)
+
+    def test_n_plus_one_detected(self):
+        """Repeated query shape is reported with its template line."""
+        template = Template(
+            '{% for post in posts %}\n{{ post.group.title }}{% endfor %}'
+        )
+        with QueryRecorder() as recorder:
+            template.render(Context({'posts': Post.objects.all()}))
+        violations = recorder.get_violations()
+        self.assertEqual(len(violations), 1)
+        self.assertIn('N+1', violations[0])
+        self.assertIn(':2', violations[0])
+
+    def test_middleware_logs_violations(self):
+        with mock.patch.dict(QUERY_BUDGETS, {'posts:index': 1}):
+            with self.assertLogs('posts.middleware', 'WARNING') as logs:
+                self.client.get(self.ADDRESS_INDEX)
+        self.assertIn('over budget of 1', logs.output[0])
@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+from django.urls import reverse
+
+from posts.constants import PAGES
+from posts.models import Group, Post
+from posts.search import SearchBackend, get_backend
+from .fixtures import TestBaseWithClients
+
+
+class SearchTests(TestBaseWithClients):
+    """Full-text search over text, group title and author name."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ADDRESS_SEARCH = reverse('posts:search')
+        cls.author.first_name = 'Лев'
+        cls.author.last_name = 'Толстой'
+        cls.author.save()
+        cls.poetry = Group.objects.create(title='Поэзия', slug='poetry')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            self.ADDRESS_SEARCH, {'q': query, **params}
+        )
+
+        return response, response.context['posts']
+
+    def test_backend_interface(self):
+        """Backends must implement every index and search method."""
+        with self.assertRaises(TypeError):
+            SearchBackend()
+
+    def test_finds_text_group_and_author(self):
+        post = Post.objects.create(
+            text='Мороз и солнце, день чудесный',
+            author=self.non_author,
+            group=self.poetry,
+        )
+        for query in ('солнце', 'СОЛН', 'поэзия', 'толстой'):
+            with self.subTest(query=query):
+                expected = [post] if query != 'толстой' else [self.post]
+                self.assertEqual(self.search(query)[1], expected)
+
+    def test_index_follows_changes(self):
+        """Edit, group rename and delete update the index."""
+        post = Post.objects.create(
+            text='старый текст', author=self.non_author, group=self.poetry
+        )
+        post.text = 'новый текст'
+        post.save()
+        self.assertEqual(self.search('старый')[1], [])
+        self.assertEqual(self.search('новый')[1], [post])
+        self.poetry.title = 'Проза'
+        self.poetry.save()
+        self.assertEqual(self.search('проза')[1], [post])
+        post.delete()
+        self.assertEqual(self.search('новый')[1], [])
+
+    def test_ranked_cursor_pages(self):
+        """Better matches first, cursor pages cover all results."""
+        best = Post.objects.create(
+            text='чай чай чай', author=self.non_author
+        )
+        Post.objects.bulk_create(
+            Post(text=f'чай {i} ' + 'слово ' * 20, author=self.non_author)
+            for i in range(PAGES * 2)
+        )
+        get_backend().rebuild()
+        response, posts = self.search('чай')
+        self.assertEqual(posts[0], best)
+        found = list(posts)
+        while 'next_cursor' in response.context:
+            response, posts = self.search(
+                'чай', cursor=response.context['next_cursor']
+            )
+            found += posts
+        self.assertEqual(len(found), PAGES * 2 + 1)
+        self.assertEqual(len(set(found)), len(found))
+
+    def test_syntax_and_bad_cursor(self):
+        """User input is never FTS syntax, broken cursor is 404."""
+        for query in ('"', 'AND OR', '*', 'NEAR(', ''):
+            with self.subTest(query=query):
+                response, _ = self.search(query)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+        response = self.client.get(
+            self.ADDRESS_SEARCH, {'q': 'чай', 'cursor': 'broken'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,154 @@
+import shutil
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from posts import thumbnails
+from posts.constants import PAGES, TEMP_MEDIA_ROOT, THUMBNAIL_WIDTHS
+from posts.models import Post, User
+from .fixtures import TestBaseWithClients
+from .utils import create_image
+
+PLACEHOLDER = 'aspect-ratio: 960 / 339'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestBaseWithClients):
+    """Thumbnails are generated off the request path."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post.image = create_image()
+        cls.post.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Delete temp media folder."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pending_thumbnail_placeholder(self):
+        """Pages do not generate thumbnails, they show a placeholder."""
+        for address in (self.ADDRESS_INDEX, self.ADDRESS_DETAIL):
+            with self.subTest(address=address):
+                response = self.non_author_client.get(address)
+                self.assertContains(response, PLACEHOLDER)
+                self.assertNotContains(response, '<img class="card-img')
+        self.assertIsNone(thumbnails.get_ready_thumbnail(self.post.image))
+
+    def test_generated_thumbnail_shown(self):
+        """Generated thumbnail replaces placeholder of cached pages."""
+        self.non_author_client.get(self.ADDRESS_INDEX)
+        updated = self.post.updated
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.get_ready_thumbnail(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
+        for address in (self.ADDRESS_INDEX, self.ADDRESS_DETAIL):
+            with self.subTest(address=address):
+                response = self.non_author_client.get(address)
+                self.assertContains(response, thumbnail.url)
+                self.assertNotContains(response, PLACEHOLDER)
+
+    def test_variants_in_srcset(self):
+        """Every width is offered in WebP and JPEG srcset."""
+        thumbnails.generate(self.post.image.name)
+        thumbnail = thumbnails.get_ready_thumbnail(self.post.image)
+        self.assertEqual(
+            len(thumbnail.variants), len(thumbnails.VARIANTS)
+        )
+        response = self.non_author_client.get(self.ADDRESS_DETAIL)
+        self.assertContains(response, 'type="image/webp"')
+        for width in THUMBNAIL_WIDTHS:
+            with self.subTest(width=width):
+                self.assertContains(response, f'.webp {width}w')
+                self.assertContains(response, f'.jpg {width}w')
+
+    def test_scheduled_on_new_image(self):
+        """Thumbnail is scheduled on commit for new images only."""
+        def commit(on_commit):
+            for call in on_commit.call_args_list:
+                call.args[0]()
+            on_commit.reset_mock()
+
+        with mock.patch(
+            'posts.signals.transaction.on_commit'
+        ) as on_commit, mock.patch(
+            'posts.signals.thumbnails.schedule'
+        ) as schedule:
+            self.post.text = 'no new image'
+            self.post.save()
+            commit(on_commit)
+            schedule.assert_not_called()
+            Post.objects.create(
+                text='new image', author=self.author, image=create_image()
+            )
+            schedule.assert_not_called()
+            commit(on_commit)
+            schedule.assert_called_once()
+
+    def test_list_page_looks_thumbnails_up_once(self):
+        """Thumbnails of a list page come from one store query."""
+        for i in range(PAGES):
+            post = Post.objects.create(
+                text=f'image {i}', author=self.author, image=create_image()
+            )
+            if i % 2:
+                thumbnails.generate(post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.non_author_client.get(self.ADDRESS_INDEX)
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        page = response.context['page_obj']
+        self.assertEqual(
+            sum(post.thumbnails.get(post.image) is not None for post in page),
+            PAGES // 2,
+        )
+        self.assertContains(response, PLACEHOLDER, count=PAGES // 2)
+
+    def test_cached_cards_skip_lookup(self):
+        """Page of cached cards does not touch the key-value store."""
+        self.non_author_client.get(self.ADDRESS_INDEX)
+        with mock.patch.object(
+            thumbnails.default.backend, 'lookup_many'
+        ) as lookup_many:
+            response = self.non_author_client.get(self.ADDRESS_INDEX)
+        lookup_many.assert_not_called()
+        self.assertContains(response, PLACEHOLDER)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=1)
+class ThumbnailPoolTests(TransactionTestCase):
+    """Worker threads see committed posts and generate their thumbnails."""
+
+    def tearDown(self):
+        if thumbnails._executor is not None:
+            thumbnails._executor.shutdown()
+            thumbnails._executor = None
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generated_in_pool(self):
+        """Saving schedules the image, a worker thread generates it."""
+        post = Post.objects.create(
+            text='image',
+            author=User.objects.create_user(username='pool'),
+            image=create_image(),
+        )
+        updated = post.updated
+        self.assertIsNotNone(thumbnails._executor)
+        thumbnails._executor.shutdown(wait=True)
+        thumbnails._executor = None
+        self.assertIsNotNone(thumbnails.get_ready_thumbnail(post.image))
+        post.refresh_from_db()
+        self.assertGreater(post.updated, updated)
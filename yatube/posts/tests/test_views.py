@@ -1,13 +1,14 @@
 import shutil
+from http import HTTPStatus
 
 from django.core.cache import cache
 from django.urls import reverse
 from django.test import override_settings
 
 from posts.forms import PostForm, CommentForm
-from posts.models import Post, Group, Follow
+from posts.models import Comment, Post, Group, Follow
 from posts.constants import PAGES, MULTIPLIER_FOR_EVERYTHING, TEMP_MEDIA_ROOT
-from .fixtures import TestBaseWithClients
+from .fixtures import QueryBudgetMixin, TestBaseWithClients
 from .utils import create_image
 
 
@@ -30,7 +31,7 @@ class TemplateTests(TestBaseWithClients):
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
-class ContextTests(TestBaseWithClients):
+class ContextTests(QueryBudgetMixin, TestBaseWithClients):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -97,7 +98,9 @@ class ContextTests(TestBaseWithClients):
     def test_context_index(self):
         """Everything in the right place. Index."""
         first_post = Post.objects.first()
-        response = self.author_client.get(self.ADDRESS_INDEX)
+        response = self.assertWithinBudget(
+            self.author_client, self.ADDRESS_INDEX
+        )
         for field in self.fields_page:
             self.fields_testing(
                 response.context['page_obj'][0],
@@ -108,7 +111,9 @@ class ContextTests(TestBaseWithClients):
     def test_context_group(self):
         """Everything in the right place. Group."""
         first_post = self.group.posts.first()
-        response = self.author_client.get(self.ADDRESS_GROUP)
+        response = self.assertWithinBudget(
+            self.author_client, self.ADDRESS_GROUP
+        )
         with self.subTest(name='page fields'):
             for field in self.fields_page:
                 self.fields_testing(
@@ -126,7 +131,9 @@ class ContextTests(TestBaseWithClients):
     def test_context_profile(self):
         """Everything in the right place. Profile."""
         first_post = self.author.posts.first()
-        response = self.non_author_client.get(self.ADDRESS_PROFILE)
+        response = self.assertWithinBudget(
+            self.non_author_client, self.ADDRESS_PROFILE
+        )
         with self.subTest(name='page fields'):
             for field in self.fields_page:
                 self.fields_testing(
@@ -148,7 +155,9 @@ class ContextTests(TestBaseWithClients):
         Everything in the right place. Post detail.
         Also comments.
         """
-        response = self.author_client.get(self.ADDRESS_DETAIL)
+        response = self.assertWithinBudget(
+            self.author_client, self.ADDRESS_DETAIL
+        )
         for field in ('text', 'group', 'author', 'id'):
             with self.subTest(name='context', field=field):
                 self.fields_testing(
@@ -173,7 +182,9 @@ class ContextTests(TestBaseWithClients):
     def test_context_profollow(self):
         """Everything in the right place. Follow index page."""
         first_post = self.follower.author.posts.first()
-        response = self.non_author_client.get(self.ADDRESS_PROFOLLOW)
+        response = self.assertWithinBudget(
+            self.non_author_client, self.ADDRESS_PROFOLLOW
+        )
         for field in self.fields_page:
             self.fields_testing(
                 response.context['page_obj'][0],
@@ -241,20 +252,187 @@ class ContextTests(TestBaseWithClients):
 
 class CacheTests(TestBaseWithClients):
     """Tests for cache."""
-    def test_cached_content_index(self):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_card(self):
         """
-        Get response, delete post.
-        Get second response, check if responses content are equal.
-        Clear cache, get third response.
-        Check that third response.content differs.
+        Get response, change post text bypassing save().
+        Second response still has the cached card.
+        Save post, third response has new text.
         """
-        response1 = self.author_client.get(self.ADDRESS_INDEX)
+        old_text = self.post.text
+        new_text = 'cards are cached'
+        addresses = (
+            self.ADDRESS_INDEX,
+            self.ADDRESS_GROUP,
+            self.ADDRESS_PROFILE,
+        )
+        for address in addresses:
+            self.author_client.get(address)
+        Post.objects.filter(pk=self.post.pk).update(text=new_text)
+        for address in addresses:
+            with self.subTest(address=address, name='cached'):
+                response = self.author_client.get(address)
+                self.assertContains(response, old_text)
+                self.assertNotContains(response, new_text)
+
+        self.post.refresh_from_db()
+        self.post.save()
+        for address in addresses:
+            with self.subTest(address=address, name='edited'):
+                response = self.author_client.get(address)
+                self.assertContains(response, new_text)
+
+    def test_card_invalidated_on_author_rename(self):
+        """Renaming author renders his cards again."""
+        self.author_client.get(self.ADDRESS_INDEX)
+        self.author.first_name = 'Renamed'
+        self.author.save()
+        response = self.author_client.get(self.ADDRESS_INDEX)
+        self.assertContains(response, 'Renamed')
+
+    def test_deleted_post_disappears(self):
+        """Without page cache deleted post leaves the index at once."""
+        self.author_client.get(self.ADDRESS_INDEX)
         self.post.delete()
-        response2 = self.author_client.get(self.ADDRESS_INDEX)
-        self.assertEqual(response1.content, response2.content)
+        response = self.author_client.get(self.ADDRESS_INDEX)
+        self.assertNotContains(response, self.post.text)
+
+
+class AnonymousPageCacheTests(TestBaseWithClients):
+    """Full-page cache for anonymous visitors."""
+    def setUp(self):
         cache.clear()
-        response3 = self.author_client.get(self.ADDRESS_INDEX)
-        self.assertNotEqual(response1.content, response3.content)
+        self.addresses = (
+            self.ADDRESS_INDEX,
+            self.ADDRESS_GROUP,
+            self.ADDRESS_PROFILE,
+        )
+
+    def test_page_served_from_cache(self):
+        """Second anonymous request does not render templates."""
+        for address in self.addresses:
+            with self.subTest(address=address):
+                first = self.client.get(address)
+                second = self.client.get(address)
+                self.assertIsNotNone(first.context)
+                self.assertIsNone(second.context)
+                self.assertEqual(first.content, second.content)
+
+    def test_new_post_invalidates_pages(self):
+        """New post starts new generation of its pages."""
+        for address in self.addresses:
+            self.client.get(address)
+        new_post = Post.objects.create(
+            text='fresh generation', author=self.author, group=self.group
+        )
+        for address in self.addresses:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertContains(response, new_post.text)
+
+    def test_conditional_get(self):
+        """Repeat visitor with the ETag gets 304, no Last-Modified."""
+        response = self.client.get(self.ADDRESS_INDEX)
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(
+            self.ADDRESS_INDEX, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_changes_within_a_second(self):
+        """Every change gives a new ETag, even within one second."""
+        etags = {self.client.get(self.ADDRESS_INDEX)['ETag']}
+        for i in range(3):
+            Post.objects.create(text=f'same second {i}', author=self.author)
+            etags.add(self.client.get(self.ADDRESS_INDEX)['ETag'])
+        self.assertEqual(len(etags), 4)
+
+    def test_missing_page_rendered_every_time(self):
+        """404 is not cached, repeat requests render it again."""
+        address = reverse('posts:group_list', args=['missing'])
+        for _ in range(2):
+            response = self.client.get(address)
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_authorized_not_cached(self):
+        """Logged in users always get freshly rendered pages."""
+        for _ in range(2):
+            response = self.author_client.get(self.ADDRESS_INDEX)
+            self.assertIsNotNone(response.context)
+
+
+class ConditionalGetTests(TestBaseWithClients):
+    """Post detail and profile answer conditional GET with 304."""
+    def setUp(self):
+        cache.clear()
+
+    def get_etag(self, client, address):
+        return client.get(address)['ETag']
+
+    def assertNotModified(self, client, address, etag):
+        response = client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def assertModified(self, client, address, etag):
+        response = client.get(address, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_unchanged_pages_not_modified(self):
+        """Nothing changed: 304 for anonymous and authorized."""
+        for client in (self.client, self.non_author_client):
+            for address in (self.ADDRESS_DETAIL, self.ADDRESS_PROFILE):
+                with self.subTest(address=address):
+                    etag = self.get_etag(client, address)
+                    self.assertNotModified(client, address, etag)
+
+    def test_detail_not_modified_before_heavy_queries(self):
+        """304 costs session, user and one validator query."""
+        etag = self.get_etag(self.non_author_client, self.ADDRESS_DETAIL)
+        with self.assertNumQueries(3):
+            self.assertNotModified(
+                self.non_author_client, self.ADDRESS_DETAIL, etag
+            )
+
+    def test_detail_modified_by_comment_and_edit(self):
+        """New comment and post edit change the validator."""
+        etag = self.get_etag(self.non_author_client, self.ADDRESS_DETAIL)
+        Comment.objects.create(
+            text='new comment', post=self.post, author=self.author
+        )
+        self.assertModified(self.non_author_client, self.ADDRESS_DETAIL, etag)
+        etag = self.get_etag(self.non_author_client, self.ADDRESS_DETAIL)
+        self.post.text = 'edited'
+        self.post.save()
+        self.assertModified(self.non_author_client, self.ADDRESS_DETAIL, etag)
+
+    def test_profile_modified_by_follow(self):
+        """Following the author changes his profile page."""
+        etag = self.get_etag(self.non_author_client, self.ADDRESS_PROFILE)
+        Follow.objects.create(author=self.author, user=self.non_author)
+        self.assertModified(
+            self.non_author_client, self.ADDRESS_PROFILE, etag
+        )
+
+    def test_lists_modified_by_follow(self):
+        """Follow links on the cards change with the viewer's follows."""
+        addresses = (self.ADDRESS_INDEX, self.ADDRESS_GROUP)
+        etags = [
+            self.get_etag(self.non_author_client, address)
+            for address in addresses
+        ]
+        Follow.objects.create(author=self.author, user=self.non_author)
+        for address, etag in zip(addresses, etags):
+            with self.subTest(address=address):
+                self.assertModified(self.non_author_client, address, etag)
+
+    def test_validator_depends_on_viewer(self):
+        """Pages rendered for one user are not reused for another."""
+        for address in (self.ADDRESS_DETAIL, self.ADDRESS_PROFILE):
+            with self.subTest(address=address):
+                etag = self.get_etag(self.author_client, address)
+                self.assertModified(self.non_author_client, address, etag)
 
 
 class FollowersTests(TestBaseWithClients):
@@ -0,0 +1,277 @@
+"""
+Post image thumbnails generated off the request path.
+
+Saving a post with a new image schedules its variants, THUMBNAIL_WIDTHS
+in each of THUMBNAIL_FORMATS, in a worker pool. Templates only look them
+up in sorl's key-value store and show a placeholder while they are
+pending; once they are ready the post version is bumped so cached cards
+and pages pick them up. List pages resolve variants of the whole page
+with one key-value store round trip, made only when a card fragment
+misses the cache and renders its image.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from sorl.thumbnail import base, default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE,
+    KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.metrics import thumbnail_timer
+from core.routers import use_primary
+from .constants import (
+    THUMBNAIL_FORMATS,
+    THUMBNAIL_GEOMETRY,
+    THUMBNAIL_OPTIONS,
+    THUMBNAIL_WIDTHS,
+)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    """sorl backend that can look thumbnails up without creating them."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Thumbnail ImageFile as get_thumbnail() would name it."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(base.default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+
+        return ImageFile(name, default.storage)
+
+    def lookup_many(self, requests):
+        """
+        {key: (file, geometry, options)} to {key: ready thumbnail or None}
+        in one store round trip.
+        """
+        thumbnails = {
+            key: self.get_thumbnail_file(file_, geometry_string, **options)
+            for key, (file_, geometry_string, options) in requests.items()
+        }
+        kvstore = default.kvstore
+        if not isinstance(kvstore, CachedDBKVStore):
+            return {
+                key: kvstore.get(thumbnail)
+                for key, thumbnail in thumbnails.items()
+            }
+
+        raw_keys = {
+            key: add_prefix(thumbnail.key)
+            for key, thumbnail in thumbnails.items()
+        }
+        values = kvstore.cache.get_many(raw_keys.values())
+        missing = set(raw_keys.values()) - set(values)
+        if missing:
+            # Same as KVStore._get_raw(), misses are cached as empty.
+            found = dict(
+                KVStoreModel.objects.filter(
+                    key__in=missing
+                ).values_list('key', 'value')
+            )
+            fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+            kvstore.cache.set_many(
+                fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            values.update(fetched)
+
+        return {
+            key: deserialize_thumbnail(values[raw_key])
+            for key, raw_key in raw_keys.items()
+        }
+
+
+def deserialize_thumbnail(value):
+    if not value or value == EMPTY_VALUE:
+        return None
+
+    return deserialize_image_file(value)
+
+
+def get_variants():
+    """(width, format, geometry, options) of every generated variant."""
+    width, height = map(int, THUMBNAIL_GEOMETRY.split('x'))
+    variants = []
+    for variant_width in THUMBNAIL_WIDTHS:
+        geometry = f'{variant_width}x{round(height * variant_width / width)}'
+        for format_ in THUMBNAIL_FORMATS:
+            options = dict(THUMBNAIL_OPTIONS, format=format_)
+            variants.append((variant_width, format_, geometry, options))
+
+    return variants
+
+
+VARIANTS = get_variants()
+# Variant for src of <img>, shown when no srcset candidate fits.
+DEFAULT_VARIANT = (max(THUMBNAIL_WIDTHS), 'JPEG')
+
+
+class ResponsiveImage:
+    """Generated variants of a post image, {(width, format): thumbnail}."""
+    MIME_TYPES = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}
+
+    def __init__(self, variants):
+        self.variants = variants
+
+    @property
+    def url(self):
+        return self.variants[DEFAULT_VARIANT].url
+
+    def get_srcset(self, format_):
+        return ', '.join(
+            f'{thumbnail.url} {width}w'
+            for (width, variant_format), thumbnail
+            in sorted(self.variants.items())
+            if variant_format == format_
+        )
+
+    @property
+    def srcset(self):
+        return self.get_srcset(DEFAULT_VARIANT[1])
+
+    @property
+    def sources(self):
+        """(mime type, srcset) of formats preferred over the default."""
+        return [
+            (self.MIME_TYPES[format_], self.get_srcset(format_))
+            for format_ in THUMBNAIL_FORMATS
+            if format_ != DEFAULT_VARIANT[1] and self.get_srcset(format_)
+        ]
+
+
+def get_images(names):
+    """{image name: ResponsiveImage, None while it is pending}."""
+    requests = {
+        (name, width, format_): (name, geometry, options)
+        for name in names
+        for width, format_, geometry, options in VARIANTS
+    }
+    found = {}
+    if requests:
+        with thumbnail_timer():
+            found = default.backend.lookup_many(requests)
+    images = {}
+    for name in names:
+        variants = {
+            (width, format_): found[name, width, format_]
+            for width, format_, _, _ in VARIANTS
+            if found[name, width, format_] is not None
+        }
+        images[name] = (
+            ResponsiveImage(variants) if DEFAULT_VARIANT in variants else None
+        )
+
+    return images
+
+
+def get_ready_thumbnail(image):
+    """Variants of post image if it is already generated."""
+    if not image:
+        return None
+
+    return get_images([str(image)])[str(image)]
+
+
+class PageThumbnails:
+    """
+    Thumbnails of a page of posts, looked up together on the first
+    request, so pages whose cards all come from the cache skip the store.
+    """
+
+    def __init__(self, posts):
+        self.names = {post.image.name for post in posts if post.image}
+        self.images = None
+
+    def get(self, image):
+        """ResponsiveImage of the page image or None while it is pending."""
+        if not image:
+            return None
+        if self.images is None:
+            self.images = get_images(self.names)
+
+        return self.images.get(image.name)
+
+
+def attach_thumbnails(posts):
+    """Set post.thumbnails of the posts to their shared PageThumbnails."""
+    posts = list(posts)
+    page = PageThumbnails(posts)
+    for post in posts:
+        post.thumbnails = page
+
+
+def generate(name):
+    """Create every variant of the image, refresh posts showing it."""
+    from .signals import refresh_posts
+
+    # Replicas may not have the key-value rows just written yet.
+    try:
+        with use_primary():
+            for _, format_, geometry, options in VARIANTS:
+                try:
+                    with thumbnail_timer():
+                        default.backend.get_thumbnail(
+                            name, geometry, **options
+                        )
+                except Exception:
+                    logger.exception(
+                        '%s thumbnail of %s failed', format_, name
+                    )
+            if get_ready_thumbnail(name) is not None:
+                refresh_posts(image=name)
+    finally:
+        with _pending_lock:
+            _pending.discard(name)
+
+
+def _work(name):
+    try:
+        generate(name)
+    finally:
+        close_old_connections()
+
+
+def schedule(image):
+    """
+    Queue thumbnail generation unless it is already queued,
+    Future of the queued work or None.
+    """
+    if not image:
+        return None
+    name = str(image)
+    with _pending_lock:
+        if name in _pending:
+            return None
+        _pending.add(name)
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        generate(name)
+        return None
+
+    global _executor
+    with _pending_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+
+    return _executor.submit(_work, name)
@@ -18,6 +18,11 @@ urlpatterns = [
         views.AddCommentView.as_view(),
         name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.CommentsView.as_view(),
+        name='comments'
+    ),
     path(
         'posts/<int:post_id>/edit/',
         views.PostEditView.as_view(),
@@ -29,7 +34,9 @@ urlpatterns = [
         name='post_detail'
     ),
     path('create/', views.PostCreateView.as_view(), name='post_create'),
+    path('search/', views.SearchView.as_view(), name='search'),
     path('follow/', views.FollowIndexView.as_view(), name='follow_index'),
+    path('export/', views.ExportView.as_view(), name='export'),
     path(
         'profile/<str:username>/follow/',
         views.ProfileFollowView.as_view(),
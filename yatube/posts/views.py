@@ -1,83 +1,192 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage
+from django.db.models import Max
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect
 from django.views.generic import (
     FormView,
     ListView,
     DetailView,
+    TemplateView,
     UpdateView,
-    CreateView
+    CreateView,
+    View,
 )
 from django.urls import reverse
 
-from .constants import PAGES
-from .models import Post, Group, User, Follow
+from .constants import COMMENTS_PAGE, PAGES
+from . import counters
+from .authors import attach_authors, get_author
+from .cache import (
+    AnonymousPageCacheMixin,
+    ConditionalGetMixin,
+    author_scope,
+    group_scope,
+)
+from .export import FORMATS, Export, stream, stream_zip
+from .feed import get_feed, heavy_author_ids
+from .follows import get_follow_set
+from .models import Post, Group, Follow
 from .forms import PostForm, CommentForm
+from .paginators import CountedPaginator, CursorPaginator
+from .search import decode_cursor, encode_cursor, get_backend
+from .thumbnails import attach_thumbnails
+
+
+def get_comments(post, cursor=None):
+    """Page of post comments, newest first, from ?cursor= on."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PAGE
+    )
+    try:
+        return paginator.page(cursor)
+    except InvalidPage as e:
+        raise Http404(str(e))
+
+
+class PostListMixin:
+    """
+    Paginates post lists. Post count comes from scope counters,
+    with POSTS_CURSOR_PAGINATION enabled pages are addressed
+    by ?cursor= instead of ?page= and nothing is counted.
+    """
+    paginate_by = PAGES
+    paginator_class = CountedPaginator
+
+    def get_count_scopes(self):
+        """Counter scopes of the list, None to count the queryset."""
+        return None
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset,
+            per_page,
+            scopes=self.get_count_scopes(),
+            **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not settings.POSTS_CURSOR_PAGINATION:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidPage as e:
+            raise Http404(str(e))
+
+        return paginator, page, page.object_list, page.has_other_pages()
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attach_thumbnails(context['page_obj'])
+        attach_authors(context['page_obj'])
 
-def get_author(username):
-    return get_object_or_404(User, username=username)
+        return context
 
 
-class IndexView(ListView):
+class IndexView(AnonymousPageCacheMixin, PostListMixin, ListView):
     """Index page."""
-    queryset = Post.objects.select_related('group', 'author')
+    queryset = Post.objects.select_related('group')
     template_name = 'posts/index.html'
-    paginate_by = PAGES
 
+    def get_page_scopes(self):
+        return ['posts']
 
-class GroupView(ListView):
+    def get_count_scopes(self):
+        return ['posts']
+
+
+class GroupView(AnonymousPageCacheMixin, PostListMixin, ListView):
     """Group list page."""
     template_name = 'posts/group_list.html'
-    paginate_by = PAGES
+
+    def get_page_scopes(self):
+        return [group_scope(self.kwargs['slug'])]
 
     def get_group(self):
         return get_object_or_404(Group, slug=self.kwargs['slug'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['group'] = self.get_group()
+        context['group'] = self.group
 
         return context
 
+    def get_count_scopes(self):
+        return [counters.group_scope(self.group.pk)]
+
     def get_queryset(self):
-        group = self.get_group()
-        posts = group.posts.select_related('author')
+        self.group = self.get_group()
+        posts = self.group.posts.all()
 
         return posts
 
 
-class ProfileView(ListView):
+class ProfileView(AnonymousPageCacheMixin, PostListMixin, ListView):
     """Profile page."""
     template_name = 'posts/profile.html'
-    paginate_by = PAGES
+
+    def get_page_scopes(self):
+        return [author_scope(self.kwargs['username'])]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        author = get_author(self.kwargs['username'])
+        author = self.author
         user = self.request.user
-        context['author'] = author
-        if user.is_authenticated and user != author:
-            context['following'] = Follow.objects.filter(
-                author=author,
-                user=user
-            ).exists()
+        context['author'] = author.as_user()
+        if user.is_authenticated and user.pk != author.pk:
+            context['following'] = (
+                author.pk in get_follow_set(self.request)
+            )
 
         return context
 
+    def get_count_scopes(self):
+        return [counters.author_scope(self.author.pk)]
+
     def get_queryset(self):
-        author = get_author(self.kwargs['username'])
-        posts = author.posts.all()
+        self.author = get_author(self.kwargs['username'])
+        posts = Post.objects.filter(
+            author_id=self.author.pk
+        ).select_related('group')
 
         return posts
 
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, DetailView):
     """Post detail page."""
     template_name = 'posts/post_detail.html'
 
+    def get_validators(self):
+        state = Post.objects.filter(
+            pk=self.kwargs.get('post_id')
+        ).annotate(
+            last_comment=Max('comments__created')
+        ).values_list(
+            'updated',
+            'last_comment',
+            'comments_count',
+            'author__profile__posts_count',
+        ).first()
+        if state is None:
+            return None
+
+        return '|'.join(map(str, (
+            self.request.get_full_path(),
+            self.request.user.pk,
+            *state,
+        )))
+
     def get_object(self):
         post = get_object_or_404(
-            Post.objects.select_related('author', 'group'),
+            Post.objects.select_related('author__profile', 'group'),
             pk=self.kwargs.get('post_id')
         )
 
@@ -85,12 +194,31 @@ class PostDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['comments'] = self.get_object().comments.all()
+        context['comments'] = get_comments(
+            self.object, self.request.GET.get('cursor')
+        )
         context['form'] = CommentForm()
 
         return context
 
 
+class CommentsView(TemplateView):
+    """Next page of post comments, fragment for "load more"."""
+    template_name = 'posts/includes/comments.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        post = get_object_or_404(
+            Post.objects.only('pk'), pk=self.kwargs.get('post_id')
+        )
+        context['post'] = post
+        context['comments'] = get_comments(
+            post, self.request.GET.get('cursor')
+        )
+
+        return context
+
+
 class PostCreateView(LoginRequiredMixin, FormView):
     """Post creating form."""
     template_name = 'posts/post_create.html'
@@ -169,13 +297,21 @@ class AddCommentView(LoginRequiredMixin, FormView):
         )
 
 
-class FollowIndexView(LoginRequiredMixin, ListView):
+class FollowIndexView(LoginRequiredMixin, PostListMixin, ListView):
     """Posts of followed authors."""
     template_name = 'posts/follow.html'
-    paginate_by = PAGES
+
+    def get_count_scopes(self):
+        # Heavy authors are merged at read time and may overlap
+        # with materialized entries, so such feeds are counted.
+        if not self.heavy_authors:
+            return [counters.feed_scope(self.request.user.pk)]
 
     def get_queryset(self):
-        posts = Post.objects.filter(author__following__user=self.request.user)
+        self.heavy_authors = list(heavy_author_ids(self.request.user))
+        posts = get_feed(
+            self.request.user, self.heavy_authors
+        ).select_related('group')
 
         return posts
 
@@ -186,8 +322,8 @@ class ProfileFollowView(LoginRequiredMixin, CreateView):
         author = get_author(self.kwargs['username'])
         user = request.user
         # Is there a way to check this on model level?
-        if author != user:
-            Follow.objects.get_or_create(author=author, user=user)
+        if author.pk != user.pk:
+            Follow.objects.get_or_create(author_id=author.pk, user=user)
 
         return redirect(
             reverse(
@@ -202,7 +338,7 @@ class ProfileUnFollowView(LoginRequiredMixin, CreateView):
     def get(self, request, *args, **kwargs):
         author = get_author(self.kwargs['username'])
         user = request.user
-        Follow.objects.filter(author=author, user=user).delete()
+        Follow.objects.filter(author_id=author.pk, user=user).delete()
 
         return redirect(
             reverse(
@@ -210,3 +346,68 @@ class ProfileUnFollowView(LoginRequiredMixin, CreateView):
                 kwargs={'username': self.kwargs['username']}
             )
         )
+
+
+class SearchView(TemplateView):
+    """Full-text search of posts, best matches first."""
+    template_name = 'posts/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        cursor = self.request.GET.get('cursor')
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except InvalidPage as e:
+            raise Http404(str(e))
+        results = []
+        if query:
+            results = get_backend().search(query, PAGES + 1, after)
+        found = Post.objects.select_related('group').in_bulk(
+            [pk for _, pk in results[:PAGES]]
+        )
+        # Index may briefly lag behind deleted posts.
+        posts = [found[pk] for _, pk in results[:PAGES] if pk in found]
+        attach_thumbnails(posts)
+        attach_authors(posts)
+        context['query'] = query
+        context['posts'] = posts
+        if len(results) > PAGES:
+            context['next_cursor'] = encode_cursor(*results[PAGES - 1])
+
+        return context
+
+
+class ExportView(LoginRequiredMixin, View):
+    """
+    Streams posts and comments of the user, of ?group=<slug> for staff.
+    ?format=ndjson|csv, ?images=1 packs them with the images into a zip.
+    """
+
+    def get(self, request, *args, **kwargs):
+        format_ = request.GET.get('format', 'ndjson')
+        if format_ not in FORMATS:
+            return HttpResponseBadRequest(
+                f'format must be one of: {", ".join(FORMATS)}.'
+            )
+        slug = request.GET.get('group')
+        if slug is None:
+            export = Export(user=request.user)
+        elif request.user.is_staff:
+            export = Export(group=get_object_or_404(Group, slug=slug))
+        else:
+            return HttpResponseForbidden('Group export is for staff only.')
+        if request.GET.get('images'):
+            response = StreamingHttpResponse(
+                stream_zip(export, format_), content_type='application/zip'
+            )
+            filename = f'yatube-{export.name}.zip'
+        else:
+            response = StreamingHttpResponse(
+                stream(export, format_),
+                content_type=f'{FORMATS[format_]}; charset=utf-8',
+            )
+            filename = f'yatube-{export.name}.{format_}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='feed_backfill',
+            field=models.BooleanField(default=False, editable=False, verbose_name='лента ждёт заполнения'),
+        ),
+    ]
@@ -0,0 +1,129 @@
+"""
+PostgreSQL backend with connection health checks and an optional
+in-process connection pool.
+
+Extra DATABASES keys:
+  CONN_HEALTH_CHECKS - check a persistent connection with SELECT 1 before
+                       its first use in a request, reconnect if it is dead.
+  POOL_SIZE          - keep this many connections in a process wide pool,
+                       opened on the first use, closing a connection
+                       returns it to the pool. Use with CONN_MAX_AGE = 0.
+"""
+import threading
+
+from django.db.backends.postgresql import base, creation
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections keep the test database busy.
+        self.connection.close_pool()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    health_check_done = False
+    pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_size(self):
+        return self.settings_dict.get('POOL_SIZE') or 0
+
+    def get_pool(self, conn_params):
+        from psycopg2.pool import ThreadedConnectionPool
+
+        with _pools_lock:
+            params, pool = _pools.get(self.alias, (None, None))
+            # Parameters change when tests switch to the test database.
+            if params != conn_params:
+                if pool is not None:
+                    pool.closeall()
+                # psycopg2 closes returned connections above minconn.
+                pool = ThreadedConnectionPool(
+                    self.pool_size, self.pool_size, **conn_params
+                )
+                _pools[self.alias] = conn_params, pool
+
+            return pool
+
+    def close_pool(self):
+        """Закрывает все соединения пула этой базы."""
+        with _pools_lock:
+            _, pool = _pools.pop(self.alias, (None, None))
+        if pool is not None:
+            pool.closeall()
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_size:
+            return super().get_new_connection(conn_params)
+        self.pool = self.get_pool(conn_params)
+        # After a server restart every idle connection is dead, the pool
+        # opens a new one when the idle ones are used up.
+        for _ in range(self.pool_size):
+            connection = self.pool.getconn()
+            if not connection.closed and (
+                not self.health_check_enabled or self.ping(connection)
+            ):
+                break
+            self.pool.putconn(connection, close=True)
+        else:
+            connection = self.pool.getconn()
+
+        return connection
+
+    def ping(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except base.Database.Error:
+            return False
+
+        return True
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or pool.closed or self.connection is None:
+            return super()._close()
+        broken = bool(self.connection.closed)
+        if not broken:
+            try:
+                self.connection.rollback()
+            except base.Database.Error:
+                broken = True
+        with self.wrap_database_errors:
+            pool.putconn(self.connection, close=broken)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Kept connection is checked again on its first use.
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+
+        return super()._cursor(name)
@@ -0,0 +1,30 @@
+"""
+SQLite backend tuned for a single node serving readers and writers.
+
+Every new connection runs PRAGMAS of the database settings, by default
+WAL journal so writers do not block readers, synchronous=NORMAL which is
+durable with WAL except for the last commits on power loss, memory
+mapped reads, a 64 MB page cache and a busy timeout instead of
+immediate 'database is locked' errors.
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict.get('PRAGMAS', DEFAULT_PRAGMAS)
+        for pragma, value in pragmas.items():
+            connection.execute(f'PRAGMA {pragma} = {value}')
+
+        return connection
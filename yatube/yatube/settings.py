@@ -1,4 +1,8 @@
 import os
+import sys
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -7,6 +11,14 @@ SECRET_KEY = 'put_your_secret_key_in_here'
 
 DEBUG = True
 
+# Under test runners only the per-request log line is quieted,
+# behaviour is set by explicit settings below.
+TESTING = 'test' in sys.argv[1:2] or 'pytest' in sys.modules
+
+# /metrics answers only requests with 'Authorization: Bearer <token>',
+# without a token it is off. Client addresses are not checked.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -24,10 +36,13 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -52,6 +68,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.viewer_follows',
             ],
         },
     },
@@ -59,12 +76,68 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# DB_ENGINE=postgresql selects the production profile, SQLite otherwise.
+# DB_POOL: empty for persistent connections, 'internal' for a pool
+# inside the process, 'pgbouncer' behind pgbouncer in transaction mode.
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+DB_POOL = os.getenv('DB_POOL', '')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'yatube.db.postgresql',
+            'NAME': os.getenv('DB_NAME', 'yatube'),
+            'USER': os.getenv('POSTGRES_USER', 'yatube'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
     }
-}
+    if DB_POOL == 'internal':
+        DATABASES['default']['POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 10))
+        # Connections go back to the pool at the end of every request.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+    elif DB_POOL == 'pgbouncer':
+        # Named cursors do not survive transaction pooling.
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    # WAL, mmap and other PRAGMAS, DB_SQLITE_TUNING=0 for stock SQLite.
+    # DB_NAME is the database file, a separate one for benchmarks.
+    DATABASES = {
+        'default': {
+            'ENGINE': (
+                'yatube.db.sqlite3' if os.getenv('DB_SQLITE_TUNING', '1') == '1'
+                else 'django.db.backends.sqlite3'
+            ),
+            'NAME': os.getenv('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
+    }
+
+# DB_REPLICAS: comma separated read replicas, hosts for PostgreSQL or
+# database files for SQLite. Reads are routed there by core.routers.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    DATABASES[alias]['HOST' if DB_ENGINE == 'postgresql' else 'NAME'] = replica
+    DATABASE_REPLICAS.append(alias)
+if TESTING and not DATABASE_REPLICAS:
+    # Mirror of the test database, routing tests turn it on as a replica.
+    DATABASES['replica1'] = dict(
+        DATABASES['default'], TEST={'MIRROR': 'default'}
+    )
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Seconds a client reads from default after writing, covers replica lag.
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -113,8 +186,69 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Looks thumbnails up without generating them on the request path.
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+
+# Threads generating post thumbnails in background, set it in deployment.
+# With 0 they are generated in the request once the post is committed.
+POSTS_THUMBNAIL_WORKERS = int(os.getenv('POSTS_THUMBNAIL_WORKERS', 0))
+
+# Full-text search engine of /search/, see posts.search.SearchBackend.
+POSTS_SEARCH_BACKEND = (
+    'posts.search.PostgresFTSBackend' if DB_ENGINE == 'postgresql'
+    else 'posts.search.SQLiteFTSBackend'
+)
+
+# Keyset pagination for post lists: ?cursor= links, no OFFSET, no COUNT(*).
+POSTS_CURSOR_PAGINATION = False
+
+# Cache authors each user follows, see posts.follows.
+POSTS_FOLLOW_SET_CACHE = True
+
+# Log posts views going over QUERY_BUDGETS or running N+1 queries.
+POSTS_QUERY_BUDGETS = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One JSON line with timings per request.
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'WARNING' if TESTING else 'INFO',
+        },
+        'posts': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
+# CACHE_BACKEND: 'locmem' for one process, 'file' shared by the workers
+# of a host, 'redis' shared by all hosts (needs django-redis).
+# CACHE_LOCATION is the directory or the redis:// URL.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': {
+            'locmem': 'core.cache.LocMemCache',
+            'file': 'core.cache.FileBasedCache',
+            'redis': 'core.cache.RedisCache',
+        }[CACHE_BACKEND],
     }
 }
+if CACHE_BACKEND == 'file':
+    CACHES['default']['LOCATION'] = os.getenv(
+        'CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'yatube-cache')
+    )
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 100000}
+elif CACHE_BACKEND == 'redis':
+    try:
+        import django_redis  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            'CACHE_BACKEND=redis needs django-redis from requirements.txt.'
+        )
+    CACHES['default']['LOCATION'] = os.getenv(
+        'CACHE_LOCATION', 'redis://127.0.0.1:6379/1'
+    )